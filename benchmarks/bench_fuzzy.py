@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from common import make_clients, make_typo
+
+from src.dopgen.fuzzy import damerau_levenshtein, max_distance_for
+from src.dopgen.utils import CompanyIndex, normalize_text
+
+
+def full_sweep(query: str, keys: list[str]) -> list[str]:
+    max_distance = max_distance_for(query)
+    return [key for key in keys if damerau_levenshtein(query, key, max_distance) <= max_distance]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fuzzy company lookup latency vs catalog size")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=500, help="Typo queries per size")
+    parser.add_argument("--sweep-queries", type=int, default=20, help="Queries for the full-sweep baseline")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--max-p95-ratio",
+        type=float,
+        default=3.0,
+        help="Fail when p95 at the largest size exceeds p95 at the smallest by more than this factor",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    p95_by_size: dict[int, float] = {}
+    print(f"{'entries':>8} {'build ms':>9} {'mean us':>8} {'p95 us':>8} {'recall':>7} {'sweep us':>9}")
+    for size in (int(item) for item in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        clients = make_clients(size, rng)
+
+        started = time.perf_counter()
+        index = CompanyIndex(clients)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        targets = rng.sample(list(clients), min(args.queries, size))
+        queries = [(target, make_typo(target, rng)) for target in targets]
+        timings = []
+        hits = 0
+        for target, query in queries:
+            started = time.perf_counter()
+            matches = index.find(query)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+            hits += normalize_text(target) in matches
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        p95_by_size[size] = p95
+
+        keys = list(clients)
+        started = time.perf_counter()
+        for _, query in queries[: args.sweep_queries]:
+            full_sweep(query, keys)
+        sweep_us = (time.perf_counter() - started) * 1_000_000 / min(args.sweep_queries, len(queries))
+        print(
+            f"{size:>8} {build_ms:>9.1f} {statistics.fmean(timings):>8.1f} "
+            f"{p95:>8.1f} {hits / len(queries):>7.1%} {sweep_us:>9.0f}"
+        )
+
+    smallest, largest = min(p95_by_size), max(p95_by_size)
+    ratio = p95_by_size[largest] / p95_by_size[smallest]
+    print(f"p95 {largest} vs {smallest} entries: {ratio:.2f}x (limit {args.max_p95_ratio:.2f}x)")
+    if ratio > args.max_p95_ratio:
+        raise SystemExit(f"fuzzy lookup p95 grows with catalog size: {ratio:.2f}x > {args.max_p95_ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
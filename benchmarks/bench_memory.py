@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date
+import gc
+import json
+import random
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from common import make_clients
+
+from cryptography.fernet import Fernet
+
+from src.dopgen.clients_store import ChunkedClients, LazyClients, write_chunked_clients
+from src.dopgen.records import ClientRecord, intern_text
+from src.dopgen.utils import CompanyIndex
+
+
+def retained_kib(build: Callable[[], object]) -> tuple[float, object]:
+    """Memory still allocated after ``build`` returns, with its temporaries collected."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current / 1024, result
+
+
+def make_sessions(count: int, clients: CompanyIndex, intern: bool, rng: random.Random) -> list[dict]:
+    """user_data of ``count`` users at the confirm step, keys arriving as fresh callback strings."""
+    keys = list(clients)
+    fresh = (lambda value: intern_text(value)) if intern else (lambda value: json.loads(json.dumps(value)))
+    sessions = []
+    for idx in range(count):
+        company_key = fresh(rng.choice(keys))
+        sessions.append(
+            {
+                "company_key": company_key,
+                "client_data": clients[company_key],
+                "dop_num": str(idx),
+                "payment_type": fresh("deferment"),
+                "delivery_type": fresh("delivery"),
+                "current_date": date(2026, 3, 1),
+                "delivery_date": date(2026, 3, 15),
+                "pay_date": date(2026, 4, 1),
+                "product_key": fresh("дтз"),
+                "tons": 25,
+                "price": 62500,
+                "location_key": fresh("танеко"),
+                "unload_address": "г. Казань, ул. Тестовая, д. 1",
+            }
+        )
+    return sessions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Retained memory of client catalogs and session data")
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--sessions", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    clients = make_clients(args.clients, random.Random(args.seed))
+    payload = json.dumps(clients, ensure_ascii=False)
+    del clients
+
+    rows: list[tuple[str, float]] = []
+    dict_kib, _ = retained_kib(lambda: json.loads(payload))
+    rows.append((f"{args.clients} clients as parsed dicts", dict_kib))
+    record_kib, _ = retained_kib(
+        lambda: {intern_text(k): ClientRecord.from_mapping(v) for k, v in json.loads(payload).items()}
+    )
+    rows.append((f"{args.clients} clients as ClientRecord", record_kib))
+
+    fernet_key = Fernet.generate_key().decode("ascii")
+    with tempfile.TemporaryDirectory() as tmp:
+        enc_path = Path(tmp) / "clients.enc"
+        write_chunked_clients(enc_path, json.loads(payload), fernet_key)
+        lazy_kib, lazy = retained_kib(lambda: LazyClients(ChunkedClients(enc_path, fernet_key)))
+        rows.append((f"{args.clients} clients as LazyClients index", lazy_kib))
+        lazy.close()
+
+    index_kib, index = retained_kib(lambda: CompanyIndex(json.loads(payload)))
+    rows.append(("CompanyIndex over ClientRecord (records + search index)", index_kib))
+
+    rng = random.Random(args.seed)
+    fresh_kib, _ = retained_kib(lambda: make_sessions(args.sessions, index, False, rng))
+    rows.append((f"{args.sessions} sessions, fresh key strings", fresh_kib))
+    interned_kib, _ = retained_kib(lambda: make_sessions(args.sessions, index, True, rng))
+    rows.append((f"{args.sessions} sessions, interned keys", interned_kib))
+
+    width = max(len(name) for name, _ in rows)
+    print(f"{'structure':<{width}} {'KiB':>10}")
+    for name, kib in rows:
+        print(f"{name:<{width}} {kib:>10.1f}")
+    print(f"\nClientRecord vs dict: {record_kib / dict_kib:.0%} of the memory")
+    print(f"Interned session keys vs fresh: {interned_kib / fresh_kib:.0%} of the memory")
+
+
+if __name__ == "__main__":
+    main()
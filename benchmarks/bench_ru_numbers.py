@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.ru_numbers import build_price_full, build_tons_full, int_to_words_ru
+
+
+def per_call_us(fn, numbers: list[int]) -> float:
+    started = time.perf_counter()
+    for number in numbers:
+        fn(number)
+    return (time.perf_counter() - started) * 1_000_000 / len(numbers)
+
+
+def import_ms(module: str, repeats: int) -> float:
+    """Best-of cold import time of ``module`` in a fresh interpreter."""
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    best = float("inf")
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        )
+        best = min(best, float(result.stdout))
+    return best * 1000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Russian number spelling: ru_numbers vs num2words")
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--distinct", type=int, default=200, help="Distinct tons/price values in the repeated workload")
+    parser.add_argument("--import-repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    unique = [rng.randint(1, 10**9) for _ in range(args.calls)]
+    pool = [rng.choice((rng.randint(1, 100), rng.randint(10_000, 200_000))) for _ in range(args.distinct)]
+    repeated = [rng.choice(pool) for _ in range(args.calls)]
+
+    table = int_to_words_ru.__wrapped__
+    rows = [("table, unique values", per_call_us(table, unique))]
+    int_to_words_ru.cache_clear()
+    rows.append(("cached, repeated values", per_call_us(int_to_words_ru, repeated)))
+    int_to_words_ru.cache_clear()
+    rows.append(("build_tons_full + build_price_full", per_call_us(lambda n: (build_tons_full(n), build_price_full(n)), repeated)))
+    try:
+        from num2words import num2words
+    except ImportError:
+        print("num2words is not installed; reference timings skipped")
+    else:
+        rows.append(("num2words, unique values", per_call_us(lambda n: num2words(n, lang="ru"), unique)))
+        rows.append(("num2words, repeated values", per_call_us(lambda n: num2words(n, lang="ru"), repeated)))
+
+    print(f"{'workload':<36} {'us/call':>8}")
+    for name, value in rows:
+        print(f"{name:<36} {value:>8.2f}")
+
+    print(f"\n{'cold import':<36} {'ms':>8}")
+    for module in ("src.dopgen.ru_numbers", "num2words"):
+        try:
+            print(f"{module:<36} {import_ms(module, args.import_repeats):>8.1f}")
+        except subprocess.CalledProcessError:
+            print(f"{module:<36} {'n/a':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from telegram import Chat, Message, Update, User
+from telegram.ext import BaseUpdateProcessor, SimpleUpdateProcessor
+
+from src.dopgen.updates import PerUserUpdateProcessor
+
+
+def make_updates(users: int, steps: int, rng: random.Random) -> list[Update]:
+    """Interleaved conversation steps of ``users`` simulated managers, in arrival order."""
+    remaining = {user_id: steps for user_id in range(1, users + 1)}
+    now = datetime.now(timezone.utc)
+    updates: list[Update] = []
+    while remaining:
+        user_id = rng.choice(list(remaining))
+        step = steps - remaining[user_id]
+        remaining[user_id] -= 1
+        if not remaining[user_id]:
+            del remaining[user_id]
+        user = User(user_id, f"user{user_id}", is_bot=False)
+        chat = Chat(user_id, Chat.PRIVATE)
+        message = Message(len(updates) + 1, now, chat, from_user=user, text=str(step))
+        updates.append(Update(len(updates) + 1, message=message))
+    return updates
+
+
+async def drive(processor: BaseUpdateProcessor, updates: list[Update], latency: float) -> tuple[float, int]:
+    """Feed updates the way Application does (a task per update) and check per-user ordering."""
+    seen: dict[int, list[int]] = {}
+    busy: set[int] = set()
+    violations = 0
+
+    async def handle(update: Update) -> None:
+        nonlocal violations
+        user_id = update.effective_user.id
+        if user_id in busy:
+            violations += 1
+        busy.add(user_id)
+        # Stands in for Telegram API calls and awaiting the render pool.
+        await asyncio.sleep(latency)
+        seen.setdefault(user_id, []).append(int(update.effective_message.text))
+        busy.discard(user_id)
+
+    started = time.perf_counter()
+    async with processor:
+        tasks = [asyncio.create_task(processor.process_update(update, handle(update))) for update in updates]
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    for steps in seen.values():
+        violations += steps != sorted(steps)
+    return elapsed, violations
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Update throughput with per-user ordering vs sequential processing")
+    parser.add_argument("--users", default="1,10,50,200", help="Comma-separated simulated user counts")
+    parser.add_argument("--steps", type=int, default=12, help="Conversation steps per user")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated handler latency")
+    parser.add_argument("--concurrency", default="1,8,16,64", help="Comma-separated global caps to compare")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    latency = args.latency_ms / 1000
+    caps = [int(item) for item in args.concurrency.split(",")]
+    header = f"{'users':>6} {'updates':>8} {'sequential/s':>13}"
+    header += "".join(f" {f'cap={cap}/s':>10}" for cap in caps)
+    print(header)
+
+    for users in (int(item) for item in args.users.split(",")):
+        updates = make_updates(users, args.steps, random.Random(args.seed))
+        elapsed, violations = asyncio.run(drive(SimpleUpdateProcessor(1), updates, latency))
+        row = f"{users:>6} {len(updates):>8} {len(updates) / elapsed:>13.0f}"
+        for cap in caps:
+            elapsed, bad = asyncio.run(drive(PerUserUpdateProcessor(cap), updates, latency))
+            violations += bad
+            row += f" {len(updates) / elapsed:>10.0f}"
+        print(row + ("" if not violations else f"  ORDER VIOLATIONS: {violations}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+ALPHABET = "абвгдежзиклмнопрстуфхцчшэюя"
+SYLLABLES = ["нефть", "трейд", "про", "ком", "снаб", "ойл", "транс", "газ", "сервис", "урал", "волга", "кама"]
+SURNAMES = ["Иванова", "Петрова", "Сидорова", "Кузнецова", "Смирнова", "Попова"]
+
+
+def make_clients(size: int, rng: random.Random) -> dict[str, dict[str, str]]:
+    clients: dict[str, dict[str, str]] = {}
+    while len(clients) < size:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        name += "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 3)))
+        surname = rng.choice(SURNAMES)
+        clients[name] = {
+            "company_name": f"Общество с ограниченной ответственностью «{name.title()}»",
+            "contract": f"№ {rng.randint(1, 999)}/{rng.randint(2019, 2025)}-П",
+            "director_position": "Генерального директора",
+            "director_fio": f"{surname} Ивана Ивановича",
+            "initials": f"И.И. {surname[:-1]}",
+        }
+    return clients
+
+
+def make_catalog(size: int, prefix: str, label: str, rng: random.Random) -> dict[str, str]:
+    catalog: dict[str, str] = {}
+    while len(catalog) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 2)))
+        key = f"{prefix}-{word}-{len(catalog)}"
+        catalog[key] = f"{label} {word.title()} марки {rng.choice(ALPHABET).upper()}-{rng.randint(1, 99)}"
+    return catalog
+
+
+def make_typo(word: str, rng: random.Random) -> str:
+    pos = rng.randrange(len(word))
+    op = rng.choice(("delete", "replace", "swap", "insert"))
+    if op == "delete":
+        return word[:pos] + word[pos + 1 :]
+    if op == "replace":
+        return word[:pos] + rng.choice(ALPHABET) + word[pos + 1 :]
+    if op == "swap" and pos < len(word) - 1:
+        return word[:pos] + word[pos + 1] + word[pos] + word[pos + 2 :]
+    return word[:pos] + rng.choice(ALPHABET) + word[pos:]
+
+
+@dataclass(frozen=True)
+class Measurement:
+    ops_per_sec: float
+    mean_us: float
+    peak_kib: float
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.2, repeats: int = 3) -> Measurement:
+    """Best-of-``repeats`` throughput of ``fn`` plus its peak traced allocation for one call."""
+    fn()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 4 or number >= 1 << 20:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    best = float("inf")
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - started) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(ops_per_sec=1 / best, mean_us=best * 1_000_000, peak_kib=peak / 1024)
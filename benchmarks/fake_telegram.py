@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from email.parser import BytesParser
+from email.policy import HTTP
+import itertools
+import json
+import time
+from typing import Any
+from urllib.parse import parse_qsl
+
+from common import ROOT_DIR  # noqa: F401  (puts the repo root on sys.path)
+
+from src.dopgen.http_server import HttpServer, Request, Response
+
+BOT_USER = {"id": 4242, "is_bot": True, "first_name": "Fuel", "username": "fuel_load_bot"}
+LONG_POLL_CAP = 5.0
+
+
+@dataclass
+class BotCall:
+    """One outgoing Bot API call addressed to a chat, as the user would see it."""
+
+    method: str
+    chat_id: int
+    text: str
+    message: dict | None
+    reply_markup: dict | None
+    received: float
+    document_size: int = 0
+
+    def callback_data(self, prefix: str) -> str | None:
+        keyboard = (self.reply_markup or {}).get("inline_keyboard") or []
+        for row in keyboard:
+            for button in row:
+                data = button.get("callback_data") or ""
+                if data.startswith(prefix):
+                    return data
+        return None
+
+
+@dataclass
+class _Chat:
+    outbox: asyncio.Queue = field(default_factory=asyncio.Queue)
+    messages: dict[int, dict] = field(default_factory=dict)
+    next_message_id: itertools.count = field(default_factory=lambda: itertools.count(1))
+
+
+def _parse_params(request: Request) -> tuple[dict[str, Any], int]:
+    """Form or multipart parameters of a Bot API call, plus the uploaded file size."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + request.body
+        )
+        params: dict[str, Any] = {}
+        file_size = 0
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename():
+                file_size += len(payload)
+                params[name] = part.get_filename()
+            else:
+                params[name] = payload.decode("utf-8")
+        return params, file_size
+    if content_type.startswith("application/json"):
+        return json.loads(request.body or b"{}"), 0
+    return dict(parse_qsl(request.body.decode("utf-8"))), 0
+
+
+def _json_param(params: dict[str, Any], name: str) -> Any:
+    value = params.get(name)
+    if isinstance(value, str) and value[:1] in "[{":
+        return json.loads(value)
+    return value
+
+
+class FakeTelegramServer:
+    """Offline stand-in for api.telegram.org covering the calls the bot makes.
+
+    Updates pushed by a driver are handed to the bot through long-polled
+    getUpdates; everything the bot sends to a chat lands in that chat's outbox.
+    """
+
+    def __init__(self, token: str, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.token = token
+        self.http = HttpServer(host, port)
+        self.calls: Counter[str] = Counter()
+        self._updates: list[dict] = []
+        self._update_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+        self._chats: dict[int, _Chat] = {}
+        self.polling = asyncio.Event()
+        self._closing = False
+
+        handlers = {
+            "getMe": self._get_me,
+            "deleteWebhook": self._true,
+            "setMyCommands": self._true,
+            "close": self._true,
+            "logOut": self._true,
+            "getUpdates": self._get_updates,
+            "sendMessage": self._send_message,
+            "sendDocument": self._send_document,
+            "editMessageText": self._edit_message_text,
+            "answerCallbackQuery": self._true,
+        }
+        for method, handler in handlers.items():
+            self.http.route("POST", f"/bot{token}/{method}", self._wrap(method, handler))
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.http.host}:{self.http.port}"
+
+    async def start(self) -> None:
+        await self.http.start()
+
+    async def stop(self) -> None:
+        # Release pending long polls so their connections finish before the listener closes.
+        self._closing = True
+        self._new_updates.set()
+        await asyncio.sleep(0)
+        await self.http.stop()
+
+    def chat(self, chat_id: int) -> _Chat:
+        return self._chats.setdefault(chat_id, _Chat())
+
+    def _wrap(self, method: str, handler):
+        async def handle(request: Request) -> Response:
+            self.calls[method] += 1
+            params, file_size = _parse_params(request)
+            result = await handler(params, file_size)
+            body = json.dumps({"ok": True, "result": result}, ensure_ascii=False).encode("utf-8")
+            return Response(body=body, content_type="application/json")
+
+        return handle
+
+    # -- driver side -----------------------------------------------------------------
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"Manager {user_id}", "language_code": "ru"}
+
+    def _push(self, update: dict) -> None:
+        update["update_id"] = next(self._update_ids)
+        self._updates.append(update)
+        self._new_updates.set()
+
+    def push_text(self, user_id: int, text: str) -> None:
+        chat = self.chat(user_id)
+        message = {
+            "message_id": next(chat.next_message_id),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        self._push({"message": message})
+
+    def push_callback(self, user_id: int, message: dict, data: str) -> None:
+        self._push(
+            {
+                "callback_query": {
+                    "id": str(next(self._callback_ids)),
+                    "from": self._user(user_id),
+                    "message": message,
+                    "chat_instance": str(user_id),
+                    "data": data,
+                }
+            }
+        )
+
+    # -- Bot API methods -----------------------------------------------------------
+
+    async def _true(self, params: dict, file_size: int) -> bool:
+        return True
+
+    async def _get_me(self, params: dict, file_size: int) -> dict:
+        return BOT_USER
+
+    async def _get_updates(self, params: dict, file_size: int) -> list[dict]:
+        self.polling.set()
+        offset = int(params.get("offset") or 0)
+        if offset:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and not self._closing:
+            self._new_updates.clear()
+            timeout = min(float(params.get("timeout") or 0), LONG_POLL_CAP)
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        return self._updates[:limit]
+
+    def _store(self, chat_id: int, text: str, reply_markup: dict | None, extra: dict | None = None) -> dict:
+        chat = self.chat(chat_id)
+        message = {
+            "message_id": next(chat.next_message_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+            **(extra or {}),
+        }
+        if reply_markup and "inline_keyboard" in reply_markup:
+            message["reply_markup"] = reply_markup
+        chat.messages[message["message_id"]] = message
+        return message
+
+    async def _send_message(self, params: dict, file_size: int) -> dict:
+        chat_id = int(params["chat_id"])
+        reply_markup = _json_param(params, "reply_markup")
+        message = self._store(chat_id, params.get("text", ""), reply_markup)
+        self.chat(chat_id).outbox.put_nowait(
+            BotCall("sendMessage", chat_id, message["text"], message, reply_markup, time.perf_counter())
+        )
+        return message
+
+    async def _send_document(self, params: dict, file_size: int) -> dict:
+        chat_id = int(params["chat_id"])
+        file_number = next(self._file_ids)
+        document = {
+            "file_id": params["document"] if not file_size else f"doc-{file_number}",
+            "file_unique_id": f"u{file_number}",
+            "file_name": params["document"] if file_size else "cached.docx",
+            "file_size": file_size,
+        }
+        message = self._store(chat_id, "", None, {"document": document})
+        message.pop("text")
+        self.chat(chat_id).outbox.put_nowait(
+            BotCall("sendDocument", chat_id, "", message, None, time.perf_counter(), document_size=file_size)
+        )
+        return message
+
+    async def _edit_message_text(self, params: dict, file_size: int) -> dict:
+        chat_id = int(params["chat_id"])
+        message = self.chat(chat_id).messages.get(int(params["message_id"]))
+        reply_markup = _json_param(params, "reply_markup")
+        if message is None:
+            message = self._store(chat_id, params.get("text", ""), reply_markup)
+        message["text"] = params.get("text", "")
+        if reply_markup and "inline_keyboard" in reply_markup:
+            message["reply_markup"] = reply_markup
+        else:
+            message.pop("reply_markup", None)
+        self.chat(chat_id).outbox.put_nowait(
+            BotCall("editMessageText", chat_id, message["text"], message, reply_markup, time.perf_counter())
+        )
+        return message
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+from collections import defaultdict
+import json
+import os
+from pathlib import Path
+import random
+import signal
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from common import ROOT_DIR, make_clients
+from fake_telegram import BotCall, FakeTelegramServer
+
+from src.dopgen.data_loaders import load_locations, load_products
+
+TOKEN = "123456:LOAD-TEST"
+# Linux caps a single environment string at 128 KiB; CLIENTS_JSON_B64 must fit.
+MAX_ENV_VALUE = 128 * 1024 - 64
+BUTTON_CREATE = "Создать доп"
+STEPS = (
+    "start", "menu", "company", "company_select", "payment", "delivery", "delivery_date", "pay_date",
+    "product", "product_select", "location", "location_select", "address", "generate", "flow",
+)
+SCENARIOS = [
+    ("prepayment", "pickup"),
+    ("prepayment", "delivery"),
+    ("deferment", "pickup"),
+    ("deferment", "delivery"),
+]
+
+Accept = Callable[[BotCall], bool]
+
+
+class FlowError(Exception):
+    pass
+
+
+def text_is(expected: str) -> Accept:
+    return lambda call: call.text == expected
+
+
+def has_button(*prefixes: str) -> Accept:
+    return lambda call: any(call.callback_data(prefix) for prefix in prefixes)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered) + 0.5) - 1))]
+
+
+def read_rss_kib(pid: int) -> dict[str, int]:
+    """Current (VmRSS) and peak (VmHWM) resident memory of ``pid`` from /proc, Linux only."""
+    result: dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fp:
+            for line in fp:
+                name, _, value = line.partition(":")
+                if name in {"VmRSS", "VmHWM"}:
+                    result[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return result
+
+
+class Manager:
+    """One simulated user walking the /start -> confirm conversation."""
+
+    def __init__(self, server: FakeTelegramServer, user_id: int, workload: dict, args: argparse.Namespace) -> None:
+        self.server = server
+        self.user_id = user_id
+        self.chat = server.chat(user_id)
+        self.workload = workload
+        self.args = args
+        self.rng = random.Random(user_id)
+        self.timings: dict[str, list[float]] = defaultdict(list)
+        self.updates_sent = 0
+        self.last_text = ""
+
+    async def _expect(self, accept: Accept) -> BotCall:
+        deadline = time.perf_counter() + self.args.step_timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise FlowError(f"no expected reply, last bot message: {self.last_text!r}")
+            try:
+                call = await asyncio.wait_for(self.chat.outbox.get(), remaining)
+            except asyncio.TimeoutError:
+                continue
+            self.last_text = call.text or call.method
+            if accept(call):
+                return call
+
+    async def _step(self, name: str, send: Callable[[], None], accept: Accept) -> BotCall:
+        if self.args.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+        started = time.perf_counter()
+        send()
+        self.updates_sent += 1
+        call = await self._expect(accept)
+        self.timings[name].append(call.received - started)
+        return call
+
+    def _text(self, text: str) -> Callable[[], None]:
+        return lambda: self.server.push_text(self.user_id, text)
+
+    def _click(self, call: BotCall, prefix: str) -> Callable[[], None]:
+        data = call.callback_data(prefix)
+        if data is None:
+            raise FlowError(f"no {prefix!r} button under {call.text!r}")
+        return lambda: self.server.push_callback(self.user_id, call.message, data)
+
+    async def run_flow(self, flow: int) -> None:
+        payment_type, delivery_type = SCENARIOS[(self.user_id + flow) % len(SCENARIOS)]
+        company = self.rng.choice(self.workload["companies"])
+        product = self.rng.choice(self.workload["products"])
+        location = self.rng.choice(self.workload["locations"])
+        started = time.perf_counter()
+
+        await self._step("start", self._text("/start"), text_is("Выберите действие:"))
+        await self._step("menu", self._text(BUTTON_CREATE), text_is("компания, № доп. согл"))
+        call = await self._step(
+            "company", self._text(f"{company}, {self.user_id}-{flow}"), has_button("payment:", "company:")
+        )
+        if call.callback_data("company:"):
+            call = await self._step("company_select", self._click(call, "company:"), has_button("payment:"))
+        call = await self._step("payment", self._click(call, f"payment:{payment_type}"), has_button("delivery:"))
+        await self._step("delivery", self._click(call, f"delivery:{delivery_type}"), text_is("дата поставки:"))
+        if payment_type == "deferment":
+            await self._step("delivery_date", self._text("15.03.2026"), text_is("дата оплаты:"))
+            await self._step("pay_date", self._text("15.04.2026"), text_is("продукт, количество, цена:"))
+        else:
+            await self._step("delivery_date", self._text("15.03.2026"), text_is("продукт, количество, цена:"))
+
+        location_prompt = lambda call: call.text == "базис погрузки:" or bool(call.callback_data("product:"))
+        call = await self._step("product", self._text(f"{product}, 25, 62500"), location_prompt)
+        if call.callback_data("product:"):
+            await self._step("product_select", self._click(call, "product:"), text_is("базис погрузки:"))
+
+        summary_or_address = lambda call: call.text == "адрес слива:" or bool(call.callback_data("confirm:"))
+        call = await self._step(
+            "location",
+            self._text(location),
+            lambda call: summary_or_address(call) or bool(call.callback_data("location:")),
+        )
+        if call.callback_data("location:"):
+            call = await self._step("location_select", self._click(call, "location:"), summary_or_address)
+        if call.text == "адрес слива:":
+            call = await self._step("address", self._text("г. Казань, ул. Тестовая, д. 1"), has_button("confirm:"))
+
+        await self._step(
+            "generate", self._click(call, "confirm:generate"), lambda call: call.method == "sendDocument"
+        )
+        finished = await self._expect(text_is("Создать ещё один документ?"))
+        self.timings["flow"].append(finished.received - started)
+
+    async def run(self, flows: int) -> int:
+        failures = 0
+        for flow in range(flows):
+            try:
+                await self.run_flow(flow)
+            except FlowError as exc:
+                failures += 1
+                print(f"manager {self.user_id}, flow {flow}: {exc}", file=sys.stderr)
+                # Drain leftovers so the next flow starts from a clean outbox.
+                while not self.chat.outbox.empty():
+                    self.chat.outbox.get_nowait()
+        return failures
+
+
+def make_workload(size: int, seed: int) -> tuple[dict, str]:
+    clients = make_clients(size, random.Random(seed))
+    payload = json.dumps(clients, ensure_ascii=False).encode("utf-8")
+    workload = {
+        "companies": list(clients),
+        "products": list(load_products(ROOT_DIR / "data" / "products.json")),
+        "locations": list(load_locations(ROOT_DIR / "data" / "locations.json")),
+    }
+    encoded = base64.urlsafe_b64encode(payload).decode("ascii")
+    if len(encoded) > MAX_ENV_VALUE:
+        raise SystemExit(f"{size} clients do not fit into CLIENTS_JSON_B64, use --clients 150 or fewer")
+    return workload, encoded
+
+
+async def start_bot(server: FakeTelegramServer, clients_b64: str, args: argparse.Namespace, log_path: Path):
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in {"PORT", "WEBHOOK_URL", "ALLOWED_USER_IDS", "ADMIN_USER_IDS", "TRACE_FILE"}
+    }
+    env.update(
+        BOT_TOKEN=TOKEN,
+        TELEGRAM_API_URL=server.base_url,
+        BOT_MODE="polling",
+        CLIENTS_JSON_B64=clients_b64,
+        STATE_PERSISTENCE="0",
+        CATALOG_WATCH_INTERVAL="0",
+        RENDER_ENGINE=args.engine,
+    )
+    log = log_path.open("wb")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(ROOT_DIR / "bot.py"), cwd=ROOT_DIR, env=env, stdout=log, stderr=log
+    )
+    log.close()
+    ready = asyncio.ensure_future(server.polling.wait())
+    exited = asyncio.ensure_future(process.wait())
+    await asyncio.wait({ready, exited}, timeout=args.startup_timeout, return_when=asyncio.FIRST_COMPLETED)
+    if not ready.done():
+        ready.cancel()
+        if not exited.done():
+            exited.cancel()
+            process.kill()
+            await process.wait()
+        raise RuntimeError(f"bot did not start polling, see {log_path}:\n{log_path.read_text(errors='replace')[-2000:]}")
+    exited.cancel()
+    return process
+
+
+async def stop_bot(process) -> None:
+    if process.returncode is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        await asyncio.wait_for(process.wait(), 30)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def sample_rss(pid: int, samples: list[int]) -> None:
+    while True:
+        rss = read_rss_kib(pid).get("VmRSS")
+        if rss:
+            samples.append(rss)
+        await asyncio.sleep(0.1)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workload, clients_b64 = make_workload(args.clients, args.seed)
+    server = FakeTelegramServer(TOKEN)
+    await server.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "bot.log"
+        startup_started = time.perf_counter()
+        process = await start_bot(server, clients_b64, args, log_path)
+        startup_seconds = time.perf_counter() - startup_started
+        rss_start = read_rss_kib(process.pid).get("VmRSS", 0)
+        rss_samples: list[int] = []
+        sampler = asyncio.create_task(sample_rss(process.pid, rss_samples))
+
+        managers = [Manager(server, 100_000 + idx, workload, args) for idx in range(args.managers)]
+        started = time.perf_counter()
+        failures = sum(await asyncio.gather(*(manager.run(args.flows) for manager in managers)))
+        elapsed = time.perf_counter() - started
+
+        memory = read_rss_kib(process.pid)
+        sampler.cancel()
+        await stop_bot(process)
+        await server.stop()
+        if failures:
+            print(f"\nBot log tail ({log_path}):\n{log_path.read_text(errors='replace')[-2000:]}", file=sys.stderr)
+
+    timings: dict[str, list[float]] = defaultdict(list)
+    for manager in managers:
+        for name, values in manager.timings.items():
+            timings[name].extend(values)
+    completed = len(timings["flow"])
+    updates = sum(manager.updates_sent for manager in managers)
+    return {
+        "managers": args.managers,
+        "flows_requested": args.managers * args.flows,
+        "flows_completed": completed,
+        "flows_failed": failures,
+        "seconds": round(elapsed, 3),
+        "startup_seconds": round(startup_seconds, 3),
+        "flows_per_sec": round(completed / elapsed, 2),
+        "updates_per_sec": round(updates / elapsed, 1),
+        "steps": {
+            name: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+            for name, values in sorted(timings.items(), key=lambda item: STEPS.index(item[0]))
+        },
+        "rss_mib": {
+            "after_startup": round(rss_start / 1024, 1),
+            "mean_under_load": round(sum(rss_samples) / len(rss_samples) / 1024, 1) if rss_samples else None,
+            "peak": round(memory.get("VmHWM", 0) / 1024, 1),
+        },
+        "api_calls": dict(server.calls),
+    }
+
+
+def print_report(result: dict) -> None:
+    print(
+        f"{result['managers']} managers, {result['flows_completed']}/{result['flows_requested']} flows "
+        f"in {result['seconds']:.2f} s (bot startup {result['startup_seconds']:.2f} s)"
+    )
+    print(f"throughput: {result['flows_per_sec']:.2f} flows/s, {result['updates_per_sec']:.1f} updates/s")
+    rss = result["rss_mib"]
+    print(f"bot RSS: {rss['after_startup']} MiB after startup, {rss['mean_under_load']} MiB mean, {rss['peak']} MiB peak")
+    print(f"\n{'step':<16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in result["steps"].items():
+        print(
+            f"{name:<16} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+            f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}"
+        )
+    print("\nBot API calls: " + ", ".join(f"{name}={count}" for name, count in sorted(result["api_calls"].items())))
+
+
+def check_gates(result: dict, args: argparse.Namespace) -> list[str]:
+    problems = []
+    if result["flows_failed"] or result["flows_completed"] < result["flows_requested"]:
+        problems.append(f"{result['flows_failed']} flow(s) failed")
+    if args.max_p95_ms is not None:
+        for name, stats in result["steps"].items():
+            if name != "flow" and stats["p95_ms"] > args.max_p95_ms:
+                problems.append(f"step {name} p95 {stats['p95_ms']} ms > {args.max_p95_ms} ms")
+    if args.min_flows_per_sec is not None and result["flows_per_sec"] < args.min_flows_per_sec:
+        problems.append(f"throughput {result['flows_per_sec']} flows/s < {args.min_flows_per_sec}")
+    if args.max_rss_mib is not None and result["rss_mib"]["peak"] > args.max_rss_mib:
+        problems.append(f"peak RSS {result['rss_mib']['peak']} MiB > {args.max_rss_mib} MiB")
+    return problems
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="End-to-end load test: the real bot process against a local fake Bot API server"
+    )
+    parser.add_argument("--managers", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--flows", type=int, default=3, help="Documents each user generates")
+    parser.add_argument("--clients", type=int, default=150, help="Synthetic clients in the catalog")
+    parser.add_argument("--engine", default="docxtpl", help="RENDER_ENGINE for the bot")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause before each user action, s")
+    parser.add_argument("--step-timeout", type=float, default=30.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any step's p95 latency is above this")
+    parser.add_argument("--min-flows-per-sec", type=float, help="Fail if throughput is below this")
+    parser.add_argument("--max-rss-mib", type=float, help="Fail if the bot's peak RSS is above this")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    problems = check_gates(result, args)
+    if problems:
+        print("\nLoad test gate failed:\n  " + "\n  ".join(problems))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
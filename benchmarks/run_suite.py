@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date, datetime, timezone
+import fnmatch
+import json
+import platform
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterator
+
+from common import ROOT_DIR, Measurement, make_catalog, make_clients, make_typo, measure
+
+from cryptography.fernet import Fernet
+
+from src.dopgen.clients_snapshot import load_clients_with_snapshot
+from src.dopgen.clients_store import ChunkedClients, read_registry, write_chunked_clients
+from src.dopgen.render import (
+    TEMPLATE_MAP,
+    build_context,
+    clear_render_cache,
+    configure_render_cache,
+    render_docx_bytes,
+)
+from src.dopgen.ru_dates import parse_ddmmyyyy
+from src.dopgen.ru_numbers import build_price_full, build_tons_full, int_to_words_ru
+from src.dopgen.security import decrypt_clients_file, encrypt_clients_payload
+from src.dopgen.utils import CatalogIndex, CompanyIndex, find_company_matches, normalize_text, search_catalog
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+Case = tuple[str, Callable[[], object]]
+
+
+def make_catalogs(size: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    clients = make_clients(size, rng)
+    aliases = {normalize_text(key[:4] + str(idx)): key for idx, key in enumerate(list(clients)[: max(1, size // 10)])}
+    return {
+        "aliases": aliases,
+        "products": CatalogIndex(make_catalog(size, "дт", "Дизельное топливо", rng)),
+        "locations": CatalogIndex(make_catalog(size, "нпз", "Нефтебаза", rng)),
+        "clients": CompanyIndex(clients, aliases),
+        "raw_clients": clients,
+    }
+
+
+def make_collected(catalogs: dict, payment_type: str, delivery_type: str) -> dict:
+    company_key = next(iter(catalogs["clients"]))
+    return {
+        "company_key": company_key,
+        "client_data": catalogs["clients"][company_key],
+        "dop_num": "12",
+        "payment_type": payment_type,
+        "delivery_type": delivery_type,
+        "current_date": date(2024, 3, 1),
+        "delivery_date": date(2024, 3, 15),
+        "pay_date": date(2024, 4, 1),
+        "product_key": next(iter(catalogs["products"])),
+        "tons": 1250,
+        "price": 62500,
+        "location_key": next(iter(catalogs["locations"])),
+        "unload_address": "г. Казань, ул. Тестовая, д. 1",
+    }
+
+
+def cycle(fn: Callable[[str], object], queries: list[str]) -> Callable[[], object]:
+    """Call ``fn`` with the next query on every invocation."""
+    state = {"idx": 0}
+
+    def run() -> object:
+        idx = state["idx"]
+        state["idx"] = (idx + 1) % len(queries)
+        return fn(queries[idx])
+
+    return run
+
+
+def fixed_cases(seed: int) -> Iterator[Case]:
+    catalogs = make_catalogs(10, seed)
+    collected = make_collected(catalogs, "deferment", "delivery")
+    yield "build_context", lambda: build_context(collected, catalogs)
+
+    for (payment_type, delivery_type), template_rel in TEMPLATE_MAP.items():
+        context = build_context(make_collected(catalogs, payment_type, delivery_type), catalogs)
+        template_path = ROOT_DIR / template_rel
+        for engine in ("docxtpl", "fast"):
+            yield (
+                f"render[{engine}]/{template_rel.stem}",
+                lambda path=template_path, ctx=context, eng=engine: render_docx_bytes(path, ctx, eng),
+            )
+
+    dates = ["01.03.2024", "15.11.2025", "31.12", "07.07.2023"]
+    yield "parse_ddmmyyyy", cycle(parse_ddmmyyyy, dates)
+
+    rng = random.Random(seed)
+    numbers = [rng.randint(1, 10**9) for _ in range(1000)]
+    yield "int_to_words_ru/uncached", cycle(int_to_words_ru.__wrapped__, numbers)
+    yield "int_to_words_ru/cached", cycle(int_to_words_ru, numbers[:50])
+    yield "build_tons_full+price_full", cycle(lambda n: (build_tons_full(n), build_price_full(n)), numbers[:50])
+
+
+def sized_cases(size: int, seed: int, workdir: Path) -> Iterator[Case]:
+    catalogs = make_catalogs(size, seed)
+    rng = random.Random(seed + size)
+    product_keys = list(catalogs["products"])
+    client_keys = list(catalogs["raw_clients"])
+    samples = max(1, min(200, size))
+
+    product_queries = [key.split("-")[1][:5] for key in rng.sample(product_keys, samples)]
+    yield f"search_catalog/{size}", cycle(lambda q: search_catalog(q, catalogs["products"]), product_queries)
+
+    exact = rng.sample(client_keys, samples)
+    yield f"find_company_matches/exact/{size}", cycle(
+        lambda q: find_company_matches(q, catalogs["aliases"], catalogs["clients"]), exact
+    )
+    partial = [key[: max(4, len(key) // 2)] for key in exact]
+    yield f"find_company_matches/substring/{size}", cycle(
+        lambda q: find_company_matches(q, catalogs["aliases"], catalogs["clients"]), partial
+    )
+    typos = [make_typo(key, rng) for key in exact]
+    yield f"find_company_matches/typo/{size}", cycle(
+        lambda q: find_company_matches(q, catalogs["aliases"], catalogs["clients"]), typos
+    )
+
+    fernet_key = Fernet.generate_key().decode("ascii")
+    fernet = Fernet(fernet_key)
+    enc_path = workdir / f"clients_{size}.enc"
+    payload = json.dumps(catalogs["raw_clients"], ensure_ascii=False).encode("utf-8")
+    enc_path.write_bytes(encrypt_clients_payload(payload, fernet))
+    yield f"decrypt_clients/{size}", lambda: decrypt_clients_file(enc_path, fernet)
+    chunked_path = workdir / f"clients_{size}.chunked.enc"
+    write_chunked_clients(chunked_path, catalogs["raw_clients"], fernet_key)
+    yield f"decrypt_clients/chunked/{size}", lambda: read_registry(chunked_path, fernet_key)
+    with ChunkedClients(chunked_path, fernet_key) as registry:
+        keys = rng.sample(client_keys, samples)
+        yield f"decrypt_clients/chunked_one/{size}", cycle(registry.read, keys)
+    snapshot_path = workdir / f"clients_{size}.snapshot"
+    load_clients_with_snapshot(enc_path, fernet_key, snapshot_path)
+    yield f"decrypt_clients/snapshot/{size}", lambda: load_clients_with_snapshot(enc_path, fernet_key, snapshot_path)
+    yield f"company_index_build/{size}", lambda: CompanyIndex(catalogs["raw_clients"], catalogs["aliases"])
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    regressions = []
+    print(f"\n{'case':<44} {'baseline/s':>12} {'now/s':>12} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = current["ops_per_sec"] / previous["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<44} {previous['ops_per_sec']:>12.1f} {current['ops_per_sec']:>12.1f} {ratio - 1:>+8.0%}{flag}")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark suite for the document generation pipeline")
+    parser.add_argument("--sizes", default="10,1000,10000", help="Comma-separated synthetic catalog sizes")
+    parser.add_argument("--filter", default="*", help="Glob over case names, e.g. 'render*'")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing repeat")
+    parser.add_argument("--save", nargs="?", const=str(DEFAULT_BASELINE), help="Write results as baseline JSON")
+    parser.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE), help="Compare with a baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown that counts as a regression")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # Measure rendering itself, not the rendered-document cache.
+    configure_render_cache(0)
+    clear_render_cache()
+
+    results: dict[str, dict] = {}
+    print(f"{'case':<44} {'ops/s':>12} {'mean us':>10} {'peak KiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cases: list[Iterator[Case]] = [fixed_cases(args.seed)]
+        cases += [sized_cases(int(size), args.seed, Path(tmp)) for size in args.sizes.split(",")]
+        for group in cases:
+            for name, fn in group:
+                if not fnmatch.fnmatch(name, args.filter):
+                    continue
+                result: Measurement = measure(fn, args.min_time)
+                results[name] = {
+                    "ops_per_sec": round(result.ops_per_sec, 2),
+                    "mean_us": round(result.mean_us, 2),
+                    "peak_kib": round(result.peak_kib, 1),
+                }
+                print(f"{name:<44} {result.ops_per_sec:>12.1f} {result.mean_us:>10.1f} {result.peak_kib:>9.1f}")
+
+    if args.save:
+        document = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": results,
+        }
+        Path(args.save).write_text(json.dumps(document, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
 ﻿from __future__ import annotations
 
+import time
+
+# Start of the import phase reported by --startup-report.
+_IMPORTS_STARTED = time.perf_counter()
+
+import argparse
 import asyncio
+import csv
 from datetime import date
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
 import logging
 import os
-import tempfile
-import threading
+import secrets
+import signal
 from pathlib import Path
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
+from telegram.error import BadRequest
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     ApplicationBuilder,
@@ -21,14 +30,47 @@ from telegram.ext import (
     filters,
 )
 
-from src.dopgen.data_loaders import (
-    load_aliases,
-    load_clients_encrypted,
-    load_locations,
-    load_products,
+from src.dopgen.batch import (
+    BATCH_COLUMNS,
+    BATCH_MAX_ROWS,
+    BatchError,
+    build_batch_jobs,
+    format_batch_report,
+    parse_batch_csv,
+    write_batch_zip,
+)
+from src.dopgen.clients_store import LazyClients
+from src.dopgen.data_loaders import load_catalogs
+from src.dopgen.fast_render import load_splice_template
+from src.dopgen.file_cache import DocumentFileCache, document_key
+from src.dopgen.http_server import HttpServer, Request, Response
+from src.dopgen.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    REGISTRY,
+    TELEGRAM_API_ERRORS,
+    TELEGRAM_API_SECONDS,
+    observe_handler,
+    watch_event_loop_lag,
 )
-from src.dopgen.render import build_context, build_output_filename, choose_template, render_docx
+from src.dopgen.persistence import SqlitePersistence
+from src.dopgen.records import ClientRecord, intern_text
+from src.dopgen.reload import CatalogReloader, catalog_sizes
+from src.dopgen.render import (
+    DEFAULT_RENDER_CACHE_BYTES,
+    RENDER_ENGINES,
+    TEMPLATE_MAP,
+    build_context,
+    build_output_filename,
+    choose_template,
+    configure_render_cache,
+    render_cache_stats,
+    render_docx_bytes,
+    warm_render_stack,
+    warm_up_templates,
+)
+from src.dopgen.render_pool import RenderPool, RenderPoolBusy
 from src.dopgen.ru_dates import format_pay_date, parse_ddmmyyyy
+from src.dopgen.startup import PhaseTimer
 from src.dopgen.state import (
     COMPANY_INPUT,
     COMPANY_SELECT,
@@ -44,7 +86,11 @@ from src.dopgen.state import (
     START,
     UNLOAD_ADDRESS,
 )
-from src.dopgen.utils import normalize_text, sanitize_filename, search_catalog
+from src.dopgen.tracing import JsonLinesExporter, configure_tracing, shutdown_tracing, span, start_trace
+from src.dopgen.updates import PerUserUpdateProcessor
+from src.dopgen.utils import find_company_matches, sanitize_filename, search_catalog
+
+_IMPORTS_FINISHED = time.perf_counter()
 
 
 logging.basicConfig(
@@ -71,10 +117,30 @@ def _catalogs(context: ContextTypes.DEFAULT_TYPE) -> dict:
     return context.application.bot_data["catalogs"]
 
 
+def _render_pool(context: ContextTypes.DEFAULT_TYPE) -> RenderPool:
+    return context.application.bot_data["render_pool"]
+
+
+def _render_engine(context: ContextTypes.DEFAULT_TYPE) -> str:
+    return context.application.bot_data.get("render_engine", "docxtpl")
+
+
+def _document_cache(context: ContextTypes.DEFAULT_TYPE) -> DocumentFileCache:
+    return context.application.bot_data["document_cache"]
+
+
 def _allowed_user_ids(context: ContextTypes.DEFAULT_TYPE) -> set[int]:
     return context.application.bot_data.get("allowed_user_ids", set())
 
 
+def _is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    admin_ids = context.application.bot_data.get("admin_user_ids") or _allowed_user_ids(context)
+    if not admin_ids:
+        return True
+    user = update.effective_user
+    return bool(user and user.id in admin_ids)
+
+
 async def _deny_if_not_allowed(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     allowed_ids = _allowed_user_ids(context)
     if not allowed_ids:
@@ -113,33 +179,111 @@ def _format_numbered_list(items: list[str], max_items: int = 50) -> str:
     return "\n".join(lines)
 
 
-class _HealthHandler(BaseHTTPRequestHandler):
-    def do_GET(self) -> None:  # noqa: N802
-        if self.path in ("/", "/health"):
-            self.send_response(200)
-            self.send_header("Content-Type", "text/plain; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(b"ok")
-            return
-        self.send_response(404)
-        self.end_headers()
+async def _health(request: Request) -> Response:
+    return Response(body=b"ok")
 
-    def log_message(self, format: str, *args) -> None:  # noqa: A003
-        return
+
+async def _metrics(request: Request) -> Response:
+    return Response(body=REGISTRY.render().encode("utf-8"), content_type=METRICS_CONTENT_TYPE)
+
+
+class _TimedRequest(HTTPXRequest):
+    """HTTPXRequest that records Bot API latency per method."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> tuple[int, bytes]:
+        # The URL carries the bot token; only the trailing API method name is used as a label.
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            TELEGRAM_API_ERRORS.inc(method=api_method)
+            raise
+        finally:
+            TELEGRAM_API_SECONDS.observe(time.perf_counter() - started, method=api_method)
+
+
+def _register_app_metrics(app: Application, timer: PhaseTimer) -> None:
+    bot_data = app.bot_data
+
+    def gauge(name: str, documentation: str, labelnames: tuple[str, ...], callback) -> None:
+        # build_application may run more than once per process (e.g. --startup-report).
+        REGISTRY.unregister(name)
+        REGISTRY.gauge(name, documentation, labelnames, callback)
+
+    def counter(name: str, documentation: str, labelnames: tuple[str, ...], callback) -> None:
+        REGISTRY.unregister(name)
+        REGISTRY.counter(name, documentation, labelnames, callback)
+
+    def cache_stat(stat: str):
+        def read() -> dict[tuple[str], float]:
+            values = {
+                ("document_file_id",): bot_data["document_cache"].stats()[stat],
+                ("rendered_docx",): render_cache_stats()[stat],
+            }
+            clients = bot_data["catalogs"]["clients"].source
+            if isinstance(clients, LazyClients):
+                values[("decrypted_clients",)] = clients.stats()[stat]
+            return values
+
+        return read
+
+    gauge(
+        "dopgen_catalog_entries",
+        "Entries per loaded catalog.",
+        ("catalog",),
+        lambda: {(name,): size for name, size in catalog_sizes(bot_data["catalogs"]).items()},
+    )
+    gauge("dopgen_cache_entries", "Entries held by a cache.", ("cache",), cache_stat("entries"))
+    counter("dopgen_cache_hits_total", "Cache hits since start.", ("cache",), cache_stat("hits"))
+    counter("dopgen_cache_misses_total", "Cache misses since start.", ("cache",), cache_stat("misses"))
+    gauge("dopgen_cache_hit_ratio", "Cache hits divided by lookups since start.", ("cache",), cache_stat("hit_rate"))
+    gauge("dopgen_render_pool_pending", "Render jobs running or queued.", (), lambda: bot_data["render_pool"].pending)
+    gauge(
+        "dopgen_startup_phase_seconds",
+        "Duration of startup phases.",
+        ("phase",),
+        lambda: {(name,): seconds for name, seconds in timer.phases},
+    )
+
+
+def _webhook_handler(app: Application, secret: str):
+    async def handle(request: Request) -> Response:
+        if request.headers.get("x-telegram-bot-api-secret-token") != secret:
+            return Response(401)
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return Response(400)
+        await app.update_queue.put(Update.de_json(payload, app.bot))
+        return Response()
+
+    return handle
 
 
-def _start_health_server() -> ThreadingHTTPServer | None:
+def _build_http_server(app: Application, webhook: dict | None) -> HttpServer | None:
     port = (os.getenv("PORT") or "").strip()
     if not port:
         return None
 
-    server = ThreadingHTTPServer(("0.0.0.0", int(port)), _HealthHandler)
-    thread = threading.Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    logger.info("Health server started on port %s", port)
+    server = HttpServer("0.0.0.0", int(port))
+    server.route("GET", "/", _health)
+    server.route("GET", "/health", _health)
+    server.route("GET", "/metrics", _metrics)
+    if webhook:
+        server.route("POST", webhook["path"], _webhook_handler(app, webhook["secret"]))
     return server
 
 
+def _confirm_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        [
+            [InlineKeyboardButton("Сгенерировать", callback_data="confirm:generate")],
+            [InlineKeyboardButton("Отмена", callback_data="confirm:cancel")],
+        ]
+    )
+
+
 def _make_select_keyboard(prefix: str, items: list[tuple[str, str]]) -> InlineKeyboardMarkup:
     rows = []
     for key, label in items:
@@ -150,24 +294,6 @@ def _make_select_keyboard(prefix: str, items: list[tuple[str, str]]) -> InlineKe
     return InlineKeyboardMarkup(rows)
 
 
-def _find_company_matches(query: str, aliases: dict[str, str], clients: dict[str, dict]) -> list[str]:
-    normalized = normalize_text(query)
-    alias_target = aliases.get(normalized)
-    if alias_target:
-        normalized = normalize_text(alias_target)
-
-    exact = [key for key in clients if normalize_text(key) == normalized]
-    if exact:
-        return exact
-
-    matches = []
-    for key, payload in clients.items():
-        company_name = normalize_text(str(payload.get("company_name", "")))
-        if normalized and normalized in company_name:
-            matches.append(key)
-    return matches
-
-
 def _parse_company_and_dop_input(text: str) -> tuple[str, str]:
     parts = [p.strip() for p in (text or "").split(",", 1)]
     if len(parts) != 2 or not parts[0] or not parts[1]:
@@ -263,7 +389,7 @@ async def company_search_input(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text(str(exc), reply_markup=_step_menu_keyboard())
         return COMPANY_INPUT
 
-    matches = _find_company_matches(company_query, catalogs["aliases"], catalogs["clients"])
+    matches = find_company_matches(company_query, catalogs["aliases"], catalogs["clients"])
 
     if not matches:
         await update.message.reply_text(
@@ -272,18 +398,28 @@ async def company_search_input(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return COMPANY_INPUT
 
-    if len(matches) == 1:
+    # A typo-tolerant guess is never taken silently, even when it is the only one.
+    if len(matches) == 1 and not matches.fuzzy:
         key = matches[0]
+        client = catalogs["clients"].get(key)
+        if client is None:
+            await update.message.reply_text(
+                "Данные компании недоступны. Обратитесь к администратору или выберите другую компанию.",
+                reply_markup=_step_menu_keyboard(),
+            )
+            return COMPANY_INPUT
         context.user_data["company_key"] = key
-        context.user_data["client_data"] = catalogs["clients"][key]
+        context.user_data["client_data"] = client
         context.user_data["dop_num"] = dop_num_value
         await _ask_payment_type_message(update.message)
         return PAYMENT_TYPE
 
-    items = [(key, str(catalogs["clients"][key].get("company_name", ""))) for key in matches[:10]]
+    items = [(key, catalogs["clients"].company_name(key)) for key in matches[:10]]
     context.user_data["pending_dop_num"] = dop_num_value
     await update.message.reply_text(
-        "Найдено несколько компаний. Выберите нужную:",
+        "Точного совпадения нет. Возможно, вы имели в виду:"
+        if matches.fuzzy
+        else "Найдено несколько компаний. Выберите нужную:",
         reply_markup=_make_select_keyboard("company", items),
     )
     return COMPANY_SELECT
@@ -299,14 +435,14 @@ async def company_select(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text("Некорректный выбор. Введите компанию заново.")
         return COMPANY_INPUT
 
-    key = query.data.split(":", 1)[1]
-    catalogs = _catalogs(context)
-    if key not in catalogs["clients"]:
+    key = intern_text(query.data.split(":", 1)[1])
+    client = _catalogs(context)["clients"].get(key)
+    if client is None:
         await query.edit_message_text("Компания не найдена. Введите компанию заново.")
         return COMPANY_INPUT
 
     context.user_data["company_key"] = key
-    context.user_data["client_data"] = catalogs["clients"][key]
+    context.user_data["client_data"] = client
     dop_num_value = (context.user_data.pop("pending_dop_num", "") or "").strip()
     if not dop_num_value:
         await query.edit_message_text(
@@ -329,7 +465,7 @@ async def payment_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         await query.edit_message_text("Некорректный выбор типа оплаты.")
         return PAYMENT_TYPE
 
-    value = query.data.split(":", 1)[1]
+    value = intern_text(query.data.split(":", 1)[1])
     if value not in {"prepayment", "deferment"}:
         await query.edit_message_text("Некорректный выбор типа оплаты.")
         return PAYMENT_TYPE
@@ -355,7 +491,7 @@ async def delivery_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         await query.edit_message_text("Некорректный выбор типа поставки.")
         return DELIVERY_TYPE
 
-    value = query.data.split(":", 1)[1]
+    value = intern_text(query.data.split(":", 1)[1])
     if value not in {"pickup", "delivery"}:
         await query.edit_message_text("Некорректный выбор типа поставки.")
         return DELIVERY_TYPE
@@ -430,7 +566,7 @@ async def product_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         )
         return PRODUCT_INPUT
 
-    if len(matches) == 1:
+    if len(matches) == 1 and not matches.fuzzy:
         context.user_data["product_key"] = matches[0][0]
         context.user_data["tons"] = tons_value
         context.user_data["price"] = price_value
@@ -441,7 +577,9 @@ async def product_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     context.user_data["pending_price"] = price_value
 
     await update.message.reply_text(
-        "Найдено несколько продуктов. Выберите нужный:",
+        "Точного совпадения нет. Возможно, вы имели в виду:"
+        if matches.fuzzy
+        else "Найдено несколько продуктов. Выберите нужный:",
         reply_markup=_make_select_keyboard("product", matches),
     )
     return PRODUCT_SELECT
@@ -457,7 +595,7 @@ async def product_select(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text("Некорректный выбор. Введите продукт заново.")
         return PRODUCT_INPUT
 
-    key = query.data.split(":", 1)[1]
+    key = intern_text(query.data.split(":", 1)[1])
     catalogs = _catalogs(context)
     if key not in catalogs["products"]:
         await query.edit_message_text("Ключ продукта не найден. Введите продукт заново.")
@@ -492,7 +630,7 @@ async def location_input(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return LOCATION_INPUT
 
-    if len(matches) == 1:
+    if len(matches) == 1 and not matches.fuzzy:
         context.user_data["location_key"] = matches[0][0]
         if context.user_data.get("delivery_type") == "delivery":
             await update.message.reply_text("адрес слива:", reply_markup=_step_menu_keyboard())
@@ -500,7 +638,9 @@ async def location_input(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return await show_confirm(update, context)
 
     await update.message.reply_text(
-        "Найдено несколько локаций. Выберите нужную:",
+        "Точного совпадения нет. Возможно, вы имели в виду:"
+        if matches.fuzzy
+        else "Найдено несколько локаций. Выберите нужную:",
         reply_markup=_make_select_keyboard("location", matches),
     )
     return LOCATION_SELECT
@@ -516,7 +656,7 @@ async def location_select(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text("Некорректный выбор. Введите локацию заново.")
         return LOCATION_INPUT
 
-    key = query.data.split(":", 1)[1]
+    key = intern_text(query.data.split(":", 1)[1])
     catalogs = _catalogs(context)
     if key not in catalogs["locations"]:
         await query.edit_message_text("Ключ локации не найден. Введите локацию заново.")
@@ -529,14 +669,12 @@ async def location_select(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.message.reply_text("адрес слива:", reply_markup=_step_menu_keyboard())
         return UNLOAD_ADDRESS
 
+    removed = _removed_entry_step(context)
+    if removed is not None:
+        await query.message.reply_text(removed[0], reply_markup=_step_menu_keyboard())
+        return removed[1]
     summary_text = _build_summary_text(context)
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("Сгенерировать", callback_data="confirm:generate")],
-            [InlineKeyboardButton("Отмена", callback_data="confirm:cancel")],
-        ]
-    )
-    await query.message.reply_text(summary_text, reply_markup=keyboard)
+    await query.message.reply_text(summary_text, reply_markup=_confirm_keyboard())
     return CONFIRM
 
 
@@ -554,15 +692,25 @@ async def unload_address(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return await show_confirm(update, context)
 
 
+def _removed_entry_step(context: ContextTypes.DEFAULT_TYPE) -> tuple[str, int] | None:
+    """Prompt and step to repeat when a catalog reload removed the chosen product or location."""
+    catalogs = _catalogs(context)
+    if context.user_data.get("product_key") not in catalogs["products"]:
+        return "Продукт удалён из справочника. Введите заново: продукт, количество, цена:", PRODUCT_INPUT
+    if context.user_data.get("location_key") not in catalogs["locations"]:
+        return "Базис удалён из справочника. Введите заново базис погрузки:", LOCATION_INPUT
+    return None
+
+
 def _build_summary_text(context: ContextTypes.DEFAULT_TYPE) -> str:
     catalogs = _catalogs(context)
     user_data = context.user_data
     company_key = user_data["company_key"]
-    client_data = user_data["client_data"]
+    client_data: ClientRecord = user_data["client_data"]
 
     summary_lines = [
         "Проверьте данные:",
-        f"Компания: {company_key} ({client_data.get('company_name', '')})",
+        f"Компания: {company_key} ({client_data.company_name})",
         f"Номер допсоглашения: {user_data['dop_num']}",
         f"Оплата: {'предоплата' if user_data['payment_type'] == 'prepayment' else 'отсрочка'}",
         f"Поставка: {'самовывоз' if user_data['delivery_type'] == 'pickup' else 'доставка'}",
@@ -584,16 +732,12 @@ def _build_summary_text(context: ContextTypes.DEFAULT_TYPE) -> str:
 async def show_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     if await _deny_if_not_allowed(update, context):
         return ConversationHandler.END
+    removed = _removed_entry_step(context)
+    if removed is not None:
+        await update.message.reply_text(removed[0], reply_markup=_step_menu_keyboard())
+        return removed[1]
     summary_text = _build_summary_text(context)
-
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("Сгенерировать", callback_data="confirm:generate")],
-            [InlineKeyboardButton("Отмена", callback_data="confirm:cancel")],
-        ]
-    )
-
-    await update.message.reply_text(summary_text, reply_markup=keyboard)
+    await update.message.reply_text(summary_text, reply_markup=_confirm_keyboard())
     return CONFIRM
 
 
@@ -621,29 +765,77 @@ async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         await query.edit_message_text("Некорректная команда подтверждения.")
         return CONFIRM
 
+    # Catalogs may have been reloaded since the summary was shown.
+    removed = _removed_entry_step(context)
+    if removed is not None:
+        await query.edit_message_text(removed[0])
+        return removed[1]
+
+    with start_trace("generate", user_id=update.effective_user.id, engine=_render_engine(context)):
+        return await _generate_document(query, context)
+
+
+async def _generate_document(query, context: ContextTypes.DEFAULT_TYPE) -> int:
     catalogs = _catalogs(context)
 
     try:
-        template_rel = choose_template(
-            context.user_data["payment_type"],
-            context.user_data["delivery_type"],
-        )
-        template_path = BASE_DIR / template_rel
+        with span("choose_template") as current:
+            template_rel = choose_template(
+                context.user_data["payment_type"],
+                context.user_data["delivery_type"],
+            )
+            template_path = BASE_DIR / template_rel
+            current.set(template=template_rel.name)
         if not template_path.exists():
             await query.edit_message_text(f"Шаблон не найден: {template_rel}")
             return CONFIRM
 
-        context_dict = build_context(context.user_data, catalogs)
-        filename = sanitize_filename(build_output_filename(context.user_data))
-
-        temp_path = None
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-            temp_path = Path(tmp.name)
-
-        render_docx(template_path, context_dict, temp_path)
-
-        with temp_path.open("rb") as fp:
-            await query.message.reply_document(document=fp, filename=filename)
+        with span("build_context"):
+            context_dict = build_context(context.user_data, catalogs)
+            filename = sanitize_filename(build_output_filename(context.user_data))
+
+        document_cache = _document_cache(context)
+        with span("file_id_cache.lookup") as current:
+            cache_key = document_key(template_path, context_dict, filename)
+            file_id = document_cache.get(cache_key)
+            current.set(hit=file_id is not None)
+        sent = False
+        if file_id is not None:
+            try:
+                # Identical document was uploaded before: resend by reference, no render or upload.
+                with span("telegram.reply_document", by_reference=True):
+                    await query.message.reply_document(document=file_id)
+                sent = True
+            except BadRequest:
+                logger.warning("Cached file_id was rejected, rendering the document again")
+                document_cache.invalidate(cache_key)
+
+        if not sent:
+            try:
+                with span("render", pending=_render_pool(context).pending) as current:
+                    document = await _render_pool(context).run(
+                        render_docx_bytes, template_path, context_dict, _render_engine(context)
+                    )
+                    current.set(bytes=len(document))
+            except RenderPoolBusy:
+                logger.warning("Render queue is full, rejecting request")
+                await query.edit_message_text(
+                    "Сервер занят генерацией других документов. Нажмите «Сгенерировать» ещё раз через минуту.",
+                    reply_markup=_confirm_keyboard(),
+                )
+                return CONFIRM
+            except asyncio.TimeoutError:
+                logger.error("Document rendering timed out for %s", template_rel)
+                await query.edit_message_text(
+                    "Генерация документа заняла слишком много времени. Попробуйте ещё раз.",
+                    reply_markup=_confirm_keyboard(),
+                )
+                return CONFIRM
+
+            with span("telegram.reply_document", bytes=len(document)):
+                message = await query.message.reply_document(document=document, filename=filename)
+            if message.document is not None:
+                document_cache.put(cache_key, message.document.file_id)
 
         await query.edit_message_text("Готово. DOCX сформирован и отправлен.")
         context.user_data.clear()
@@ -658,10 +850,6 @@ async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         await query.edit_message_text(f"Ошибка генерации документа: {exc}")
         return CONFIRM
 
-    finally:
-        if "temp_path" in locals() and temp_path and temp_path.exists():
-            temp_path.unlink(missing_ok=True)
-
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     if await _deny_if_not_allowed(update, context):
@@ -674,7 +862,198 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return START
 
 
-def build_application() -> Application:
+BATCH_MAX_FILE_SIZE = 1024 * 1024
+
+
+async def batch_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if await _deny_if_not_allowed(update, context):
+        return
+    await update.message.reply_text(
+        "Пакетная генерация: отправьте CSV-файл (UTF-8, разделитель «;» или «,»), "
+        f"до {BATCH_MAX_ROWS} строк. Колонки:\n"
+        + ", ".join(BATCH_COLUMNS)
+        + "\n\npayment_type: предоплата/отсрочка, delivery_type: самовывоз/доставка, "
+        "даты в формате ДД.ММ.ГГГГ. pay_date обязательна для отсрочки, unload_address — для доставки, "
+        "current_date по умолчанию сегодня. В ответ придёт ZIP с документами и report.txt."
+    )
+
+
+async def batch_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if await _deny_if_not_allowed(update, context):
+        return
+    document = update.message.document
+    if document.file_size and document.file_size > BATCH_MAX_FILE_SIZE:
+        await update.message.reply_text("Файл слишком большой для пакетной генерации.")
+        return
+
+    telegram_file = await document.get_file()
+    payload = await telegram_file.download_as_bytearray()
+    try:
+        rows = parse_batch_csv(bytes(payload).decode("utf-8-sig"))
+    except UnicodeDecodeError:
+        await update.message.reply_text("CSV должен быть в кодировке UTF-8.")
+        return
+    except csv.Error as exc:
+        await update.message.reply_text(f"Не удалось разобрать CSV: {exc}")
+        return
+    except ValueError as exc:
+        await update.message.reply_text(str(exc))
+        return
+
+    status = await update.message.reply_text(f"Формирую {len(rows)} документов...")
+    # Resolving a few hundred rows (fuzzy lookups, client decryption) would stall other users.
+    jobs, errors = await asyncio.to_thread(build_batch_jobs, rows, _catalogs(context), BASE_DIR)
+
+    pool = _render_pool(context)
+    engine = _render_engine(context)
+    # Keep one batch from filling the shared queue and starving interactive users.
+    semaphore = asyncio.Semaphore(pool.workers)
+
+    async def render_job(job):
+        async with semaphore:
+            try:
+                return job, await pool.run(render_docx_bytes, job.template_path, job.context, engine)
+            except RenderPoolBusy:
+                return job, BatchError(job.line, "очередь генерации переполнена")
+            except asyncio.TimeoutError:
+                return job, BatchError(job.line, "превышено время генерации")
+            except Exception as exc:
+                logger.exception("Batch row %s failed", job.line)
+                return job, BatchError(job.line, f"ошибка генерации: {exc}")
+
+    documents: list[tuple[str, bytes]] = []
+    for job, result in await asyncio.gather(*(render_job(job) for job in jobs)):
+        if isinstance(result, BatchError):
+            errors.append(result)
+        else:
+            documents.append((job.filename, result))
+
+    report = format_batch_report(len(rows), len(documents), errors)
+    archive_name = sanitize_filename(f"{Path(document.file_name or 'batch').stem}.zip")
+    await update.message.reply_document(document=write_batch_zip(documents, report), filename=archive_name)
+    summary = report if len(report) <= 3500 else report[:3500] + "\n... полный отчёт в report.txt"
+    await status.edit_text(summary)
+
+
+async def reload_catalogs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if await _deny_if_not_allowed(update, context):
+        return
+    if not _is_admin(update, context):
+        await update.message.reply_text("Команда доступна только администраторам.")
+        return
+
+    reloader: CatalogReloader = context.application.bot_data["catalog_reloader"]
+    try:
+        catalogs = await reloader.reload("admin command")
+    except Exception as exc:
+        logger.exception("Catalog reload failed")
+        await update.message.reply_text(f"Справочники не обновлены, работаем на прежних: {exc}")
+        return
+    await update.message.reply_text(
+        "Справочники обновлены: "
+        f"компаний {len(catalogs['clients'])}, продуктов {len(catalogs['products'])}, "
+        f"базисов {len(catalogs['locations'])}, синонимов {len(catalogs['aliases'])}."
+    )
+
+
+async def _close_replaced_clients(app: Application, clients: LazyClients) -> None:
+    # Updates already running may still read the replaced catalogs; close the file after them.
+    await app.update_processor.wait_in_flight()
+    clients.close()
+    logger.info("Closed the replaced clients registry")
+
+
+def _parse_user_ids(env_name: str) -> set[int]:
+    raw = (os.getenv(env_name) or "").strip()
+    if not raw:
+        return set()
+    try:
+        return {int(item.strip()) for item in raw.split(",") if item.strip()}
+    except ValueError as exc:
+        raise RuntimeError(f"{env_name} must contain comma-separated integers.") from exc
+
+
+async def _warm_render_stack() -> None:
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_render_stack)
+    except Exception:
+        # The first render will import it again and report the real error to the user.
+        logger.exception("Background import of the render stack failed")
+        return
+    logger.info("Render stack loaded in background in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+def _warm_up_catalogs(app: Application) -> dict:
+    # Only what build_context reads; keeps the payload small for a process pool.
+    catalogs = app.bot_data["catalogs"]
+    return {"products": catalogs["products"], "locations": catalogs["locations"]}
+
+
+async def _warm_up_templates(app: Application) -> None:
+    started = time.perf_counter()
+    try:
+        # Through the render pool, so the worker that serves users has compiled templates.
+        timings = await app.bot_data["render_pool"].run(
+            warm_up_templates, BASE_DIR, _warm_up_catalogs(app), app.bot_data["render_engine"]
+        )
+    except Exception as exc:
+        logger.critical("%s", exc)
+        admin_ids = app.bot_data.get("admin_user_ids") or app.bot_data.get("allowed_user_ids") or set()
+        for admin_id in admin_ids:
+            try:
+                await app.bot.send_message(admin_id, f"Прогрев шаблонов не удался, генерация сломана:\n{exc}")
+            except Exception:
+                logger.exception("Failed to notify admin %s about template warm-up", admin_id)
+        return
+    logger.info(
+        "Templates warmed up in %.0f ms (%s)",
+        (time.perf_counter() - started) * 1000,
+        ", ".join(f"{path.name} {seconds * 1000:.0f} ms" for path, seconds in timings),
+    )
+
+
+async def _post_init(app: Application) -> None:
+    http_server = app.bot_data.get("http_server")
+    if http_server:
+        await http_server.start()
+
+    # docxtpl is not imported at startup; load it while the bot already answers updates.
+    if app.bot_data["render_warmup"] == "background":
+        app.bot_data["render_warmup_task"] = asyncio.create_task(_warm_up_templates(app))
+    else:
+        app.bot_data["render_warmup_task"] = asyncio.create_task(_warm_render_stack())
+
+    app.bot_data["event_loop_lag_task"] = asyncio.create_task(watch_event_loop_lag())
+
+    interval = app.bot_data["catalog_watch_interval"]
+    if interval > 0:
+        reloader: CatalogReloader = app.bot_data["catalog_reloader"]
+        app.bot_data["catalog_watch_task"] = asyncio.create_task(reloader.watch(interval))
+        logger.info("Watching %s for catalog changes every %.0f s", reloader.data_dir, interval)
+
+
+async def _post_shutdown(app: Application) -> None:
+    http_server = app.bot_data.get("http_server")
+    if http_server:
+        await http_server.stop()
+    for task_name in ("catalog_watch_task", "event_loop_lag_task"):
+        task = app.bot_data.get(task_name)
+        if task:
+            task.cancel()
+    pool = app.bot_data.get("render_pool")
+    if pool:
+        pool.shutdown(wait=False)
+    document_cache = app.bot_data.get("document_cache")
+    if document_cache:
+        logger.info("Document file_id cache: %s", document_cache.stats())
+    logger.info("Rendered document cache: %s", render_cache_stats())
+    # Writes the traces still queued for TRACE_FILE.
+    shutdown_tracing()
+
+
+def build_application(timer: PhaseTimer | None = None) -> Application:
+    timer = timer or PhaseTimer()
     bot_token = os.getenv("BOT_TOKEN")
     if not bot_token:
         raise RuntimeError("Environment variable BOT_TOKEN is required.")
@@ -688,65 +1067,211 @@ def build_application() -> Application:
             "Environment variable CLIENTS_JSON_B64 or CLIENTS_KEY or CLIENTS_KEY_FILE is required."
         )
 
-    aliases = load_aliases(DATA_DIR / "aliases.json")
-    products = load_products(DATA_DIR / "products.json")
-    locations = load_locations(DATA_DIR / "locations.json")
-    clients = load_clients_encrypted(DATA_DIR / "clients.enc")
-    allowed_users_raw = (os.getenv("ALLOWED_USER_IDS") or "").strip()
-    allowed_user_ids: set[int] = set()
-    if allowed_users_raw:
-        try:
-            allowed_user_ids = {
-                int(item.strip()) for item in allowed_users_raw.split(",") if item.strip()
-            }
-        except ValueError as exc:
-            raise RuntimeError("ALLOWED_USER_IDS must contain comma-separated integers.") from exc
-
-    app = ApplicationBuilder().token(bot_token).build()
-    app.bot_data["catalogs"] = {
-        "aliases": {normalize_text(k): v for k, v in aliases.items()},
-        "products": products,
-        "locations": locations,
-        "clients": clients,
-    }
+    catalogs = load_catalogs(DATA_DIR, timer)
+    allowed_user_ids = _parse_user_ids("ALLOWED_USER_IDS")
+    admin_user_ids = _parse_user_ids("ADMIN_USER_IDS")
+    try:
+        catalog_watch_interval = float((os.getenv("CATALOG_WATCH_INTERVAL") or "30").strip())
+    except ValueError as exc:
+        raise RuntimeError("CATALOG_WATCH_INTERVAL must be a number of seconds.") from exc
+
+    bot_mode = (os.getenv("BOT_MODE") or "polling").strip().lower()
+    webhook: dict | None = None
+    if bot_mode == "webhook":
+        webhook_url = (os.getenv("WEBHOOK_URL") or "").strip().rstrip("/")
+        if not webhook_url or not (os.getenv("PORT") or "").strip():
+            raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_URL and PORT.")
+        webhook_path = "/" + (os.getenv("WEBHOOK_PATH") or "telegram").strip().strip("/")
+        webhook = {
+            "url": webhook_url + webhook_path,
+            "path": webhook_path,
+            # Telegram echoes this header on every delivery; a fresh one per start is fine.
+            "secret": (os.getenv("WEBHOOK_SECRET") or "").strip() or secrets.token_urlsafe(32),
+        }
+    elif bot_mode != "polling":
+        raise RuntimeError("BOT_MODE must be 'polling' or 'webhook'.")
+
+    render_engine = (os.getenv("RENDER_ENGINE") or "docxtpl").strip().lower()
+    if render_engine not in RENDER_ENGINES:
+        raise RuntimeError(f"RENDER_ENGINE must be one of: {', '.join(RENDER_ENGINES)}.")
+    if render_engine == "fast":
+        # Locate placeholders up front so a broken template fails the deploy, not a confirm.
+        for template_rel in TEMPLATE_MAP.values():
+            load_splice_template(BASE_DIR / template_rel)
+
+    trace_file = (os.getenv("TRACE_FILE") or "").strip()
+    try:
+        trace_sample_rate = float((os.getenv("TRACE_SAMPLE_RATE") or "1").strip())
+    except ValueError as exc:
+        raise RuntimeError("TRACE_SAMPLE_RATE must be a number between 0 and 1.") from exc
+    if not 0 <= trace_sample_rate <= 1:
+        raise RuntimeError("TRACE_SAMPLE_RATE must be a number between 0 and 1.")
+    configure_tracing(JsonLinesExporter(Path(trace_file)) if trace_file else None, trace_sample_rate)
+
+    render_warmup = (os.getenv("RENDER_WARMUP") or "background").strip().lower()
+    if render_warmup not in {"background", "strict", "off"}:
+        raise RuntimeError("RENDER_WARMUP must be 'background', 'strict' or 'off'.")
+
+    try:
+        render_cache_bytes = int((os.getenv("RENDER_CACHE_BYTES") or str(DEFAULT_RENDER_CACHE_BYTES)).strip())
+    except ValueError as exc:
+        raise RuntimeError("RENDER_CACHE_BYTES must be a non-negative integer.") from exc
+    if render_cache_bytes < 0:
+        raise RuntimeError("RENDER_CACHE_BYTES must be a non-negative integer.")
+    # Set before the render pool starts so forked workers inherit the budget.
+    configure_render_cache(render_cache_bytes)
+
+    if render_warmup == "strict":
+        # Blocks startup, but a missing or broken template stops the deploy.
+        with timer.phase("template warm-up"):
+            warm_up_templates(BASE_DIR, catalogs, render_engine)
+
+    build_started = time.perf_counter()
+    render_pool = RenderPool.from_env()
+    builder = (
+        ApplicationBuilder()
+        .token(bot_token)
+        # Same pool sizes ApplicationBuilder uses by default.
+        .request(_TimedRequest(connection_pool_size=256))
+        .get_updates_request(_TimedRequest(connection_pool_size=1))
+        # Users run in parallel; each user's own updates stay strictly ordered.
+        .concurrent_updates(PerUserUpdateProcessor.from_env())
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+    )
+    api_url = (os.getenv("TELEGRAM_API_URL") or "").strip().rstrip("/")
+    if api_url:
+        # Local Bot API server, or the offline stand-in used by benchmarks/load_test.py.
+        builder = builder.base_url(f"{api_url}/bot").base_file_url(f"{api_url}/file/bot")
+    persistence_enabled = (os.getenv("STATE_PERSISTENCE") or "1").strip().lower() not in {"0", "false", "no"}
+    if persistence_enabled:
+        state_db_path = Path(os.getenv("STATE_DB_PATH") or BASE_DIR / "state.sqlite3")
+        builder = builder.persistence(
+            SqlitePersistence(
+                state_db_path,
+                # Sessions store only company_key; records come from the current catalogs.
+                resolve_client=lambda key: app.bot_data["catalogs"]["clients"].get(key),
+            )
+        )
+    app = builder.build()
+    app.bot_data["render_pool"] = render_pool
+    app.bot_data["render_engine"] = render_engine
+    app.bot_data["render_warmup"] = render_warmup
+    app.bot_data["document_cache"] = DocumentFileCache.from_env()
+    app.bot_data["catalogs"] = catalogs
     app.bot_data["allowed_user_ids"] = allowed_user_ids
+    app.bot_data["admin_user_ids"] = admin_user_ids
+
+    def swap_catalogs(new_catalogs: dict) -> None:
+        # Single reference swap: handlers read bot_data["catalogs"] once per update.
+        previous = app.bot_data["catalogs"]["clients"].source
+        app.bot_data["catalogs"] = new_catalogs
+        if isinstance(previous, LazyClients) and previous is not new_catalogs["clients"].source:
+            app.create_task(_close_replaced_clients(app, previous), name="close_replaced_clients")
+
+    app.bot_data["catalog_reloader"] = CatalogReloader(DATA_DIR, on_swap=swap_catalogs)
+    app.bot_data["catalog_watch_interval"] = catalog_watch_interval
+    app.bot_data["webhook"] = webhook
+    app.bot_data["http_server"] = _build_http_server(app, webhook)
 
     conv = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
+        entry_points=[CommandHandler("start", observe_handler(start))],
         states={
-            START: [MessageHandler(filters.TEXT & ~filters.COMMAND, start_menu)],
-            COMPANY_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, company_search_input)],
-            COMPANY_SELECT: [CallbackQueryHandler(company_select, pattern=r"^company:")],
-            PAYMENT_TYPE: [CallbackQueryHandler(payment_type, pattern=r"^payment:")],
-            DELIVERY_TYPE: [CallbackQueryHandler(delivery_type, pattern=r"^delivery:")],
-            DELIVERY_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, delivery_date)],
-            PAY_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, pay_date)],
-            PRODUCT_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, product_input)],
-            PRODUCT_SELECT: [CallbackQueryHandler(product_select, pattern=r"^product:")],
-            LOCATION_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, location_input)],
-            LOCATION_SELECT: [CallbackQueryHandler(location_select, pattern=r"^location:")],
-            UNLOAD_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, unload_address)],
-            CONFIRM: [CallbackQueryHandler(confirm, pattern=r"^confirm:")],
+            START: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(start_menu))],
+            COMPANY_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(company_search_input))],
+            COMPANY_SELECT: [CallbackQueryHandler(observe_handler(company_select), pattern=r"^company:")],
+            PAYMENT_TYPE: [CallbackQueryHandler(observe_handler(payment_type), pattern=r"^payment:")],
+            DELIVERY_TYPE: [CallbackQueryHandler(observe_handler(delivery_type), pattern=r"^delivery:")],
+            DELIVERY_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(delivery_date))],
+            PAY_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(pay_date))],
+            PRODUCT_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(product_input))],
+            PRODUCT_SELECT: [CallbackQueryHandler(observe_handler(product_select), pattern=r"^product:")],
+            LOCATION_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(location_input))],
+            LOCATION_SELECT: [CallbackQueryHandler(observe_handler(location_select), pattern=r"^location:")],
+            UNLOAD_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, observe_handler(unload_address))],
+            CONFIRM: [CallbackQueryHandler(observe_handler(confirm), pattern=r"^confirm:")],
         },
-        fallbacks=[CommandHandler("cancel", cancel)],
+        fallbacks=[CommandHandler("cancel", observe_handler(cancel))],
         allow_reentry=True,
+        name="generate",
+        persistent=persistence_enabled,
     )
 
     app.add_handler(conv)
+    app.add_handler(CommandHandler("batch", observe_handler(batch_help)))
+    app.add_handler(CommandHandler("reload", observe_handler(reload_catalogs)))
+    app.add_handler(MessageHandler(filters.Document.FileExtension("csv"), observe_handler(batch_upload)))
+    timer.record("app build", time.perf_counter() - build_started)
+    _register_app_metrics(app, timer)
     return app
 
 
+async def _run_webhook(app: Application) -> None:
+    webhook = app.bot_data["webhook"]
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:  # pragma: no cover - Windows
+            pass
+
+    await app.initialize()
+    try:
+        await _post_init(app)
+        await app.bot.set_webhook(
+            url=webhook["url"],
+            secret_token=webhook["secret"],
+            allowed_updates=Update.ALL_TYPES,
+        )
+        await app.start()
+        logger.info("Webhook mode: receiving updates at %s", webhook["url"])
+        await stop_event.wait()
+        await app.stop()
+    finally:
+        await app.shutdown()
+        await _post_shutdown(app)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Telegram bot for fuel supply agreements")
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="Build the application, print per-phase startup timings and exit",
+    )
+    return parser.parse_args()
+
+
+def startup_report() -> None:
+    timer = PhaseTimer()
+    timer.record("imports", _IMPORTS_FINISHED - _IMPORTS_STARTED)
+    app = build_application(timer)
+    print(timer.report())
+
+    deferred = PhaseTimer()
+    with deferred.phase("render stack import"):
+        warm_render_stack()
+    if app.bot_data["render_warmup"] == "background":
+        with deferred.phase("template warm-up"):
+            warm_up_templates(BASE_DIR, app.bot_data["catalogs"], app.bot_data["render_engine"])
+    print("\nIn background after start:")
+    print(deferred.report())
+
+
 def main() -> None:
+    if parse_args().startup_report:
+        startup_report()
+        return
+
     # Python 3.14 no longer creates a default event loop in main thread.
-    asyncio.set_event_loop(asyncio.new_event_loop())
-    health_server = _start_health_server()
-    try:
-        app = build_application()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    app = build_application()
+    if app.bot_data["webhook"]:
+        loop.run_until_complete(_run_webhook(app))
+    else:
         app.run_polling()
-    finally:
-        if health_server:
-            health_server.shutdown()
-            health_server.server_close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+try:
+    from num2words import num2words
+except ImportError:  # pragma: no cover - reference implementation is optional
+    raise SystemExit("num2words is required for this check: pip install num2words")
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.ru_numbers import int_to_words_ru
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare the built-in Russian number spelling with num2words(lang='ru')"
+    )
+    parser.add_argument("--exhaustive", type=int, default=100_000, help="Check every number below this bound")
+    parser.add_argument("--samples", type=int, default=200_000, help="Random samples up to --max")
+    parser.add_argument("--max", type=int, default=10**9, help="Upper bound for random samples")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def boundary_numbers(upper: int) -> set[int]:
+    """Triad edges where gender and plural forms switch: x1, x2-x4, x5, x11-x14, round values."""
+    numbers: set[int] = set()
+    scale = 1
+    while scale <= upper:
+        for base in (1, 2, 4, 5, 10, 11, 12, 14, 15, 20, 21, 22, 25, 99, 100, 101, 111, 999):
+            for offset in (-1, 0, 1):
+                value = base * scale + offset
+                if 0 <= value <= upper:
+                    numbers.add(value)
+        scale *= 1000
+    return numbers
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    numbers = set(range(args.exhaustive)) | boundary_numbers(args.max)
+    numbers.update(rng.randint(1, args.max) for _ in range(args.samples))
+    # Log-uniform samples so short numbers in every triad count are covered too.
+    digits = len(str(args.max))
+    numbers.update(
+        min(args.max, rng.randint(1, 10 ** rng.randint(1, digits))) for _ in range(args.samples // 4)
+    )
+
+    mismatches = 0
+    for number in sorted(numbers):
+        expected = num2words(number, lang="ru")
+        actual = int_to_words_ru(number)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 20:
+                print(f"DIFF  {number}:\n    num2words: {expected}\n    ru_numbers: {actual}")
+
+    print(f"checked {len(numbers)} numbers, mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
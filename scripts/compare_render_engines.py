@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date
+import io
+import sys
+from pathlib import Path
+
+from docx import Document
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.data_loaders import load_locations, load_products
+from src.dopgen.records import ClientRecord
+from src.dopgen.render import TEMPLATE_MAP, build_context, render_docx_bytes
+
+
+SAMPLE_CLIENT = ClientRecord(
+    company_name='ООО "Ромашка & Партнёры" <Юг>',
+    contract="№ 15/2024-П",
+    director_position="Генерального директора",
+    director_fio="Иванова Ивана Ивановича",
+    initials="И.И. Иванов",
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check that the fast render engine produces the same document text as docxtpl"
+    )
+    parser.add_argument("--data-dir", default=str(ROOT_DIR / "data"), help="Catalogs directory")
+    return parser.parse_args()
+
+
+def document_text(payload: bytes) -> list[str]:
+    doc = Document(io.BytesIO(payload))
+    lines = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            lines.extend(cell.text for cell in row.cells)
+    return lines
+
+
+def main() -> None:
+    args = parse_args()
+    data_dir = Path(args.data_dir)
+    catalogs = {
+        "products": load_products(data_dir / "products.json"),
+        "locations": load_locations(data_dir / "locations.json"),
+    }
+
+    failed = False
+    for (payment_type, delivery_type), template_rel in TEMPLATE_MAP.items():
+        collected = {
+            "company_key": "ромашка",
+            "client_data": SAMPLE_CLIENT,
+            "dop_num": "12",
+            "payment_type": payment_type,
+            "delivery_type": delivery_type,
+            "current_date": date(2024, 3, 1),
+            "delivery_date": date(2024, 3, 15),
+            "pay_date": date(2024, 4, 1),
+            "product_key": next(iter(catalogs["products"])),
+            "tons": 1250,
+            "price": 62500,
+            "location_key": next(iter(catalogs["locations"])),
+            "unload_address": "г. Казань, ул. Тестовая, д. 1",
+        }
+        context = build_context(collected, catalogs)
+        template_path = ROOT_DIR / template_rel
+        expected = document_text(render_docx_bytes(template_path, context, "docxtpl"))
+        actual = document_text(render_docx_bytes(template_path, context, "fast"))
+        # Both engines autoescape, so &, < and quotes must come out literally.
+        escaped = all(
+            any(SAMPLE_CLIENT.company_name in line for line in lines) for lines in (expected, actual)
+        )
+        if expected == actual and escaped:
+            print(f"OK    {template_rel}")
+            continue
+        failed = True
+        print(f"DIFF  {template_rel}")
+        if not escaped:
+            print(f"  company name {SAMPLE_CLIENT.company_name!r} is not rendered literally")
+        for idx, (left, right) in enumerate(zip(expected, actual)):
+            if left != right:
+                print(f"  line {idx}:\n    docxtpl: {left!r}\n    fast:    {right!r}")
+        if len(expected) != len(actual):
+            print(f"  line count: docxtpl={len(expected)} fast={len(actual)}")
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
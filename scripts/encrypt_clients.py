@@ -12,7 +12,8 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from src.dopgen.security import encrypt_clients_payload
+from src.dopgen.clients_store import ChunkedClients, is_chunked, write_chunked_clients
+from src.dopgen.security import SecurityError, encrypt_clients_payload
 
 
 def parse_args() -> argparse.Namespace:
@@ -20,6 +21,17 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--in", dest="in_path", default="data/clients.json", help="Input JSON path")
     parser.add_argument("--out", dest="out_path", default="data/clients.enc", help="Output ENC path")
     parser.add_argument("--key-out", dest="key_out_path", default="", help="Optional path to save Fernet key")
+    parser.add_argument(
+        "--format",
+        choices=("chunked", "legacy"),
+        default=None,
+        help="chunked: per-record encryption with an index (default); legacy: one Fernet token",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-encrypt every record instead of reusing unchanged ones from the existing output",
+    )
     return parser.parse_args()
 
 
@@ -40,14 +52,45 @@ def main() -> None:
         raise ValueError("CLIENTS_KEY looks like clients.enc payload, not Fernet key.")
 
     fernet = Fernet(key.encode("utf-8"))
+    if args.format is None:
+        args.format = "chunked"
+        print(
+            "WARNING: writing the chunked clients.enc format, the new default. Bot versions released "
+            "before it cannot read this file; pass --format legacy to keep the old format, "
+            "or --format chunked to silence this warning.",
+            file=sys.stderr,
+        )
 
     raw_text = in_path.read_text(encoding="utf-8-sig")
-    json.loads(raw_text)
-    encrypted = encrypt_clients_payload(raw_text.encode("utf-8"), fernet)
-
+    clients = json.loads(raw_text)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_bytes(encrypted)
-    print(f"Encrypted clients written to: {out_path}")
+
+    if args.format == "legacy":
+        encrypted = encrypt_clients_payload(raw_text.encode("utf-8"), fernet)
+        out_path.write_bytes(encrypted)
+        print(f"Encrypted clients written to: {out_path}")
+    else:
+        if not isinstance(clients, dict):
+            raise ValueError("clients.json must contain a JSON object.")
+        clients = {str(k): v for k, v in clients.items() if isinstance(v, dict)}
+        previous = None
+        if not args.full and out_path.exists():
+            # Read into memory: Windows refuses to replace a file that is still open.
+            existing = out_path.read_bytes()
+            if is_chunked(existing):
+                try:
+                    previous = ChunkedClients(existing, key)
+                except SecurityError as exc:
+                    print(f"Existing {out_path} is not readable with this key, re-encrypting everything: {exc}")
+        try:
+            encrypted_count, reused_count = write_chunked_clients(out_path, clients, key, previous)
+        finally:
+            if previous is not None:
+                previous.close()
+        print(
+            f"Encrypted clients written to: {out_path} "
+            f"({encrypted_count} records encrypted, {reused_count} unchanged records kept)"
+        )
 
     if args.key_out_path:
         key_out_path = Path(args.key_out_path)
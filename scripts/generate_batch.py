@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.batch import (
+    build_batch_jobs,
+    format_batch_report,
+    parse_batch_csv,
+    render_batch,
+    write_batch_zip,
+)
+from src.dopgen.data_loaders import load_catalogs
+from src.dopgen.render import RENDER_ENGINES
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate agreements for every row of a CSV into one ZIP")
+    parser.add_argument("--in", dest="in_path", required=True, help="Input CSV path")
+    parser.add_argument("--out", dest="out_path", default="agreements.zip", help="Output ZIP path")
+    parser.add_argument("--data-dir", default=str(ROOT_DIR / "data"), help="Catalogs directory")
+    parser.add_argument("--engine", choices=RENDER_ENGINES, default="docxtpl", help="Render engine")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel render workers")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    in_path = Path(args.in_path)
+    if not in_path.exists():
+        raise FileNotFoundError(f"Input file not found: {in_path}")
+
+    catalogs = load_catalogs(Path(args.data_dir))
+    rows = parse_batch_csv(in_path.read_text(encoding="utf-8-sig"))
+    jobs, errors = build_batch_jobs(rows, catalogs, ROOT_DIR)
+    documents, render_errors = render_batch(jobs, engine=args.engine, workers=args.workers)
+    errors.extend(render_errors)
+
+    report = format_batch_report(len(rows), len(documents), errors)
+    out_path = Path(args.out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(write_batch_zip(documents, report))
+    print(report)
+    print(f"ZIP written to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,27 @@
 ﻿"""Core package for fuel_tg_bot document generation."""
 
 __all__ = [
+    "batch",
+    "clients_snapshot",
+    "clients_store",
     "data_loaders",
+    "docx_render",
+    "fast_render",
+    "file_cache",
+    "fuzzy",
+    "http_server",
+    "metrics",
+    "persistence",
+    "records",
     "render",
+    "render_pool",
+    "reload",
     "ru_dates",
     "ru_numbers",
     "security",
+    "startup",
     "state",
+    "tracing",
+    "updates",
     "utils",
 ]
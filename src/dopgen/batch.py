@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from dataclasses import dataclass
+from datetime import date
+import io
+from pathlib import Path
+import zipfile
+
+from .render import build_context, build_output_filename, choose_template, render_docx_bytes
+from .ru_dates import parse_ddmmyyyy
+from .utils import find_company_matches, normalize_text, sanitize_filename, search_catalog
+
+
+BATCH_MAX_ROWS = 500
+
+BATCH_COLUMNS = (
+    "company",
+    "dop_num",
+    "payment_type",
+    "delivery_type",
+    "delivery_date",
+    "pay_date",
+    "product",
+    "tons",
+    "price",
+    "location",
+    "unload_address",
+    "current_date",
+)
+REQUIRED_COLUMNS = (
+    "company",
+    "dop_num",
+    "payment_type",
+    "delivery_type",
+    "delivery_date",
+    "product",
+    "tons",
+    "price",
+    "location",
+)
+
+PAYMENT_TYPES = {
+    "prepayment": "prepayment",
+    "предоплата": "prepayment",
+    "deferment": "deferment",
+    "отсрочка": "deferment",
+}
+DELIVERY_TYPES = {
+    "pickup": "pickup",
+    "самовывоз": "pickup",
+    "delivery": "delivery",
+    "доставка": "delivery",
+}
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    line: int
+    template_path: Path
+    context: dict[str, str]
+    filename: str
+
+
+@dataclass(frozen=True)
+class BatchError:
+    line: int
+    message: str
+
+
+class _SemicolonDialect(csv.excel):
+    # Default for Excel exports with a Russian locale.
+    delimiter = ";"
+
+
+def parse_batch_csv(text: str) -> list[tuple[int, dict[str, str]]]:
+    text = text.lstrip("\ufeff")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = _SemicolonDialect
+
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    if not reader.fieldnames:
+        raise ValueError("CSV пуст: нет строки заголовка.")
+    header = [normalize_text(name or "") for name in reader.fieldnames]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"В CSV нет обязательных колонок: {', '.join(missing)}.")
+    reader.fieldnames = header
+
+    rows: list[tuple[int, dict[str, str]]] = []
+    for row in reader:
+        values = {key: (value or "").strip() for key, value in row.items() if key in BATCH_COLUMNS}
+        if not any(values.values()):
+            continue
+        rows.append((reader.line_num, values))
+        if len(rows) > BATCH_MAX_ROWS:
+            raise ValueError(f"Слишком много строк: максимум {BATCH_MAX_ROWS}.")
+    if not rows:
+        raise ValueError("CSV не содержит строк с данными.")
+    return rows
+
+
+def _resolve_single(query: str, data: dict[str, str], what: str) -> str:
+    matches = search_catalog(query, data, limit=10)
+    if not matches:
+        raise ValueError(f"{what} не найден: {query}")
+    if matches.fuzzy:
+        # A guess is not good enough for an unattended document.
+        raise ValueError(f"{what} не найден: {query} (возможно: {', '.join(key for key, _ in matches)})")
+    if len(matches) > 1 and normalize_text(matches[0][0]) != normalize_text(query):
+        keys = ", ".join(key for key, _ in matches)
+        raise ValueError(f"{what} неоднозначен: {query} ({keys})")
+    return matches[0][0]
+
+
+def _parse_positive_int(value: str, what: str) -> int:
+    try:
+        number = int(value.replace(" ", ""))
+    except ValueError as exc:
+        raise ValueError(f"{what} должно быть целым числом: {value}") from exc
+    if number <= 0:
+        raise ValueError(f"{what} должно быть больше 0.")
+    return number
+
+
+def _parse_date(value: str, what: str) -> date:
+    try:
+        return parse_ddmmyyyy(value)
+    except ValueError as exc:
+        raise ValueError(f"{what}: неверная дата {value!r}, ожидается ДД.ММ или ДД.ММ.ГГГГ.") from exc
+
+
+def resolve_batch_row(row: dict[str, str], catalogs: dict, today: date) -> dict:
+    """Turn one CSV row into the same ``collected`` dict the conversation builds."""
+    for name in REQUIRED_COLUMNS:
+        if not row.get(name):
+            raise ValueError(f"пустое поле {name}")
+
+    matches = find_company_matches(row["company"], catalogs["aliases"], catalogs["clients"])
+    if not matches:
+        raise ValueError(f"компания не найдена: {row['company']}")
+    if matches.fuzzy:
+        raise ValueError(f"компания не найдена: {row['company']} (возможно: {', '.join(matches[:10])})")
+    if len(matches) > 1:
+        raise ValueError(f"компания неоднозначна: {row['company']} ({', '.join(matches[:10])})")
+    company_key = matches[0]
+    client = catalogs["clients"].get(company_key)
+    if client is None:
+        raise ValueError(f"данные компании недоступны: {company_key}")
+
+    payment_type = PAYMENT_TYPES.get(normalize_text(row["payment_type"]))
+    if not payment_type:
+        raise ValueError(f"неизвестный тип оплаты: {row['payment_type']}")
+    delivery_type = DELIVERY_TYPES.get(normalize_text(row["delivery_type"]))
+    if not delivery_type:
+        raise ValueError(f"неизвестный тип поставки: {row['delivery_type']}")
+
+    current_date = _parse_date(row["current_date"], "current_date") if row.get("current_date") else today
+    if payment_type == "deferment":
+        if not row.get("pay_date"):
+            raise ValueError("для отсрочки нужна pay_date")
+        pay_date = _parse_date(row["pay_date"], "pay_date")
+    else:
+        pay_date = current_date
+
+    collected = {
+        "company_key": company_key,
+        "client_data": client,
+        "dop_num": row["dop_num"],
+        "payment_type": payment_type,
+        "delivery_type": delivery_type,
+        "current_date": current_date,
+        "delivery_date": _parse_date(row["delivery_date"], "delivery_date"),
+        "pay_date": pay_date,
+        "product_key": _resolve_single(row["product"], catalogs["products"], "продукт"),
+        "tons": _parse_positive_int(row["tons"], "tons"),
+        "price": _parse_positive_int(row["price"], "price"),
+        "location_key": _resolve_single(row["location"], catalogs["locations"], "базис"),
+    }
+    if delivery_type == "delivery":
+        if not row.get("unload_address"):
+            raise ValueError("для доставки нужен unload_address")
+        collected["unload_address"] = row["unload_address"]
+    return collected
+
+
+def build_batch_jobs(
+    rows: list[tuple[int, dict[str, str]]],
+    catalogs: dict,
+    base_dir: Path,
+    today: date | None = None,
+) -> tuple[list[BatchJob], list[BatchError]]:
+    today = today or date.today()
+    jobs: list[BatchJob] = []
+    errors: list[BatchError] = []
+    used_names: set[str] = set()
+
+    for line, row in rows:
+        try:
+            collected = resolve_batch_row(row, catalogs, today)
+            template_path = base_dir / choose_template(collected["payment_type"], collected["delivery_type"])
+            context = build_context(collected, catalogs)
+        except (KeyError, ValueError) as exc:
+            errors.append(BatchError(line, str(exc)))
+            continue
+
+        filename = sanitize_filename(build_output_filename(collected))
+        stem, suffix = filename.rsplit(".", 1)
+        counter = 2
+        while filename in used_names:
+            filename = f"{stem}_{counter}.{suffix}"
+            counter += 1
+        used_names.add(filename)
+        jobs.append(BatchJob(line, template_path, context, filename))
+
+    return jobs, errors
+
+
+def render_batch(
+    jobs: list[BatchJob],
+    engine: str = "docxtpl",
+    workers: int = 4,
+) -> tuple[list[tuple[str, bytes]], list[BatchError]]:
+    documents: list[tuple[str, bytes]] = []
+    errors: list[BatchError] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        futures = [
+            (job, executor.submit(render_docx_bytes, job.template_path, job.context, engine))
+            for job in jobs
+        ]
+        for job, future in futures:
+            try:
+                documents.append((job.filename, future.result()))
+            except Exception as exc:
+                errors.append(BatchError(job.line, f"ошибка генерации: {exc}"))
+    return documents, errors
+
+
+def format_batch_report(total: int, generated: int, errors: list[BatchError]) -> str:
+    lines = [f"Строк: {total}, сформировано: {generated}, ошибок: {len(errors)}."]
+    for error in sorted(errors, key=lambda item: item.line):
+        lines.append(f"строка {error.line}: {error.message}")
+    return "\n".join(lines)
+
+
+def write_batch_zip(documents: list[tuple[str, bytes]], report: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, payload in documents:
+            # DOCX is already deflated; storing avoids a second compression pass.
+            archive.writestr(filename, payload, compress_type=zipfile.ZIP_STORED)
+        archive.writestr("report.txt", report)
+    return buffer.getvalue()
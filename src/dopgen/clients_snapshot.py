@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import marshal
+import os
+from pathlib import Path
+import sys
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .clients_store import decrypt_registry
+from .security import derive_key
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DGCS1"
+NONCE_SIZE = 12
+# marshal output is only readable by the interpreter version that wrote it.
+FORMAT_TAG = f"{sys.implementation.cache_tag}/marshal{marshal.version}".encode("ascii")
+
+
+def snapshot_cipher(fernet_key: str) -> AESGCM:
+    """AES-GCM cipher for snapshots, derived from the clients.enc Fernet key."""
+    return AESGCM(derive_key(fernet_key, b"dopgen clients snapshot v1"))
+
+
+def source_digest(encrypted: bytes) -> bytes:
+    return hashlib.sha256(encrypted).digest()
+
+
+def read_snapshot(path: Path, digest: bytes, cipher: AESGCM) -> dict[str, dict[str, str]] | None:
+    """Clients stored for the ciphertext with ``digest``, or ``None`` if missing, stale or unreadable."""
+    try:
+        blob = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    if not blob.startswith(MAGIC):
+        return None
+    nonce = blob[len(MAGIC) : len(MAGIC) + NONCE_SIZE]
+    try:
+        # The source digest is bound as associated data: a changed clients.enc fails the tag check.
+        payload = cipher.decrypt(nonce, blob[len(MAGIC) + NONCE_SIZE :], digest + FORMAT_TAG)
+        data = marshal.loads(payload)
+    except (InvalidTag, ValueError, EOFError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def write_snapshot(path: Path, digest: bytes, cipher: AESGCM, clients: dict[str, dict[str, str]]) -> None:
+    nonce = os.urandom(NONCE_SIZE)
+    blob = MAGIC + nonce + cipher.encrypt(nonce, marshal.dumps(clients), digest + FORMAT_TAG)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def load_clients_with_snapshot(
+    enc_path: Path, fernet_key: str, snapshot_path: Path
+) -> dict[str, dict[str, str]]:
+    """Decrypt ``enc_path``, reusing the snapshot written for the same ciphertext when there is one.
+
+    A snapshot is the parsed registry in marshal form under AES-GCM, so loading it skips
+    Fernet's base64 pass and JSON parsing. Any snapshot problem falls back to clients.enc.
+    """
+    encrypted = enc_path.read_bytes()
+    digest = source_digest(encrypted)
+    cipher = snapshot_cipher(fernet_key)
+    clients = read_snapshot(snapshot_path, digest, cipher)
+    if clients is not None:
+        logger.info("Loaded %d clients from snapshot %s", len(clients), snapshot_path)
+        return clients
+
+    clients = decrypt_registry(encrypted, fernet_key)
+    try:
+        write_snapshot(snapshot_path, digest, cipher, clients)
+        logger.info("Wrote clients snapshot %s", snapshot_path)
+    except (OSError, ValueError) as exc:
+        # marshal raises ValueError on unsupported values; the registry still loaded fine.
+        logger.warning("Could not write clients snapshot %s: %s", snapshot_path, exc)
+    return clients
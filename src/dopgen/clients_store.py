@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import base64
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+import hashlib
+import io
+import json
+import logging
+import os
+from pathlib import Path
+import struct
+import threading
+from typing import BinaryIO, NamedTuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .records import ClientRecord, intern_text
+from .security import SecurityError, decrypt_clients_payload, derive_key
+
+
+logger = logging.getLogger(__name__)
+
+# Chunked registry layout (v2):
+#   MAGIC | u32 header size | header nonce | AES-GCM(header JSON) | record 1 | record 2 | ...
+# The encrypted header indexes every record by key (company name, offset, size, nonce,
+# plaintext digest); each record is its own AES-GCM ciphertext with the key as
+# associated data, so one record can be read or replaced without touching the rest.
+MAGIC = b"DGC2"
+NONCE_SIZE = 12
+TAG_SIZE = 16
+_HEADER_SIZE = struct.Struct(">I")
+_PURPOSE = b"dopgen clients v2"
+_READ_BATCH = 256
+_DECODER = json.JSONDecoder()
+DEFAULT_CLIENT_CACHE_SIZE = 64
+
+
+class RecordEntry(NamedTuple):
+    company_name: str
+    offset: int
+    length: int
+    nonce: bytes
+    digest: str
+
+
+def is_chunked(prefix: bytes) -> bool:
+    return prefix.startswith(MAGIC)
+
+
+def _record_plaintext(record: Mapping[str, str]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def _digest(plaintext: bytes) -> str:
+    return hashlib.sha256(plaintext).hexdigest()[:32]
+
+
+def _record_aad(key: str) -> bytes:
+    return MAGIC + key.encode("utf-8")
+
+
+class ChunkedClients:
+    """Reader for the chunked registry: the index is decrypted up front, records on request.
+
+    A ``Path`` source stays open until ``close()``. On POSIX its records stay
+    readable after clients.enc is replaced on disk; on Windows the file cannot
+    be replaced while it is open, so read it as ``bytes`` when it is about to be.
+    """
+
+    def __init__(self, source: Path | bytes, fernet_key: str) -> None:
+        self._cipher = AESGCM(derive_key(fernet_key, _PURPOSE))
+        self._fp: BinaryIO = io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+        self._lock = threading.Lock()
+        try:
+            self.entries = self._read_header()
+        except BaseException:
+            self._fp.close()
+            raise
+
+    def _read_header(self) -> dict[str, RecordEntry]:
+        head = self._fp.read(len(MAGIC) + _HEADER_SIZE.size + NONCE_SIZE)
+        if not is_chunked(head) or len(head) < len(MAGIC) + _HEADER_SIZE.size + NONCE_SIZE:
+            raise SecurityError("clients.enc is not a chunked clients registry.")
+        (size,) = _HEADER_SIZE.unpack_from(head, len(MAGIC))
+        nonce = head[-NONCE_SIZE:]
+        try:
+            header = json.loads(self._cipher.decrypt(nonce, self._fp.read(size), MAGIC))
+        except InvalidTag as exc:
+            raise SecurityError("Unable to decrypt clients.enc: invalid CLIENTS_KEY.") from exc
+        if header.get("version") != 2:
+            raise SecurityError(f"Unsupported clients.enc version: {header.get('version')!r}.")
+        self._data_start = self._fp.tell()
+        return {
+            intern_text(key): RecordEntry(name, offset, length, base64.b64decode(record_nonce), digest)
+            for key, name, offset, length, record_nonce, digest in header["records"]
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.entries
+
+    def __enter__(self) -> ChunkedClients:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._fp.close()
+
+    def raw_record(self, key: str) -> bytes:
+        entry = self.entries[key]
+        with self._lock:
+            self._fp.seek(self._data_start + entry.offset)
+            blob = self._fp.read(entry.length)
+        if len(blob) != entry.length:
+            raise SecurityError("clients.enc is truncated.")
+        return blob
+
+    def _decrypt(self, key: str, blob: bytes | memoryview) -> dict[str, str]:
+        try:
+            plaintext = self._cipher.decrypt(self.entries[key].nonce, blob, _record_aad(key))
+        except InvalidTag as exc:
+            raise SecurityError(f"Client record {key!r} in clients.enc failed authentication.") from exc
+        return _DECODER.decode(plaintext.decode("utf-8"))
+
+    def intact_record(self, key: str) -> bytes | None:
+        """Stored ciphertext of ``key`` if it still authenticates, else ``None``."""
+        try:
+            blob = self.raw_record(key)
+            self._cipher.decrypt(self.entries[key].nonce, blob, _record_aad(key))
+        except (InvalidTag, SecurityError):
+            return None
+        return blob
+
+    def read(self, key: str) -> dict[str, str]:
+        """Decrypt one client without touching the other records."""
+        return self._decrypt(key, self.raw_record(key))
+
+    def iter_records(self) -> Iterator[tuple[str, dict[str, str]]]:
+        """Decrypt records in file order, reading the file in batches of adjacent records."""
+        ordered = sorted(self.entries.items(), key=lambda item: item[1].offset)
+        for start in range(0, len(ordered), _READ_BATCH):
+            batch = ordered[start : start + _READ_BATCH]
+            size = sum(entry.length for _, entry in batch)
+            with self._lock:
+                self._fp.seek(self._data_start + batch[0][1].offset)
+                chunk = memoryview(self._fp.read(size))
+            if len(chunk) != size:
+                raise SecurityError("clients.enc is truncated.")
+            pos = 0
+            for key, entry in batch:
+                yield key, self._decrypt(key, chunk[pos : pos + entry.length])
+                pos += entry.length
+
+    def read_all(self) -> dict[str, dict[str, str]]:
+        return dict(self.iter_records())
+
+
+class LazyClients(Mapping[str, ClientRecord]):
+    """Clients catalog over a chunked registry that decrypts records on access.
+
+    Only keys and company names stay in memory; full records are decrypted when
+    looked up and the last ``cache_size`` of them are kept in an LRU. A record
+    that fails authentication is reported as missing (``KeyError``), so ``get``
+    returns ``None`` for it like for an unknown client; from then on it is left
+    out of ``in``, iteration and ``len`` as well.
+    """
+
+    def __init__(self, registry: ChunkedClients, cache_size: int = DEFAULT_CLIENT_CACHE_SIZE) -> None:
+        self._registry = registry
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, ClientRecord] = OrderedDict()
+        self._damaged: set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key: str) -> ClientRecord:
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return record
+        if key not in self:
+            raise KeyError(key)
+        try:
+            record = ClientRecord.from_mapping(self._registry.read(key))
+        except SecurityError as exc:
+            logger.error("%s Treating the client as missing.", exc)
+            with self._lock:
+                self._damaged.add(key)
+            raise KeyError(key) from exc
+        with self._lock:
+            self.misses += 1
+            if self.cache_size > 0:
+                self._cache[key] = record
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return record
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._registry and key not in self._damaged
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._registry.entries if key not in self._damaged)
+
+    def __len__(self) -> int:
+        return len(self._registry) - len(self._damaged)
+
+    def company_name(self, key: str) -> str:
+        return self._registry.entries[key].company_name
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._cache.clear()
+        self._registry.close()
+
+
+def write_chunked_clients(
+    path: Path,
+    clients: Mapping[str, Mapping[str, str]],
+    fernet_key: str,
+    previous: ChunkedClients | None = None,
+) -> tuple[int, int]:
+    """Write ``clients`` as a chunked registry; returns (records encrypted, records reused).
+
+    Intact records whose plaintext matches ``previous`` keep their old ciphertext,
+    so a one-client edit produces a new ciphertext for one record plus the index.
+    Reused ciphertexts are read before ``path`` is touched, but a ``previous``
+    opened from ``path`` itself must be opened from bytes on Windows.
+    """
+    cipher = AESGCM(derive_key(fernet_key, _PURPOSE))
+    # Sizes are known before encrypting (AES-GCM adds only the tag), so the index
+    # goes first and records are then encrypted and written one at a time.
+    plan: list[tuple[str, bytes, bytes | None]] = []
+    records = []
+    offset = 0
+    for key, record in clients.items():
+        plaintext = _record_plaintext(record)
+        digest = _digest(plaintext)
+        old = previous.entries.get(key) if previous is not None else None
+        # A damaged record is re-encrypted rather than copied forward.
+        kept = previous.intact_record(key) if old is not None and old.digest == digest else None
+        nonce = old.nonce if kept is not None else os.urandom(NONCE_SIZE)
+        length = len(kept) if kept is not None else len(plaintext) + TAG_SIZE
+        plan.append((key, nonce, kept))
+        records.append(
+            [key, str(record.get("company_name", "")), offset, length, base64.b64encode(nonce).decode("ascii"), digest]
+        )
+        offset += length
+    header = json.dumps({"version": 2, "records": records}, ensure_ascii=False).encode("utf-8")
+    header_nonce = os.urandom(NONCE_SIZE)
+    header_ct = cipher.encrypt(header_nonce, header, MAGIC)
+
+    encrypted = reused = 0
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as fp:
+            fp.write(MAGIC + _HEADER_SIZE.pack(len(header_ct)) + header_nonce + header_ct)
+            for key, nonce, kept in plan:
+                if kept is not None:
+                    fp.write(kept)
+                    reused += 1
+                else:
+                    fp.write(cipher.encrypt(nonce, _record_plaintext(clients[key]), _record_aad(key)))
+                    encrypted += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return encrypted, reused
+
+
+def decrypt_registry(encrypted: bytes, fernet_key: str) -> dict[str, dict[str, str]]:
+    """Clients from either clients.enc format held in memory."""
+    if is_chunked(encrypted):
+        with ChunkedClients(encrypted, fernet_key) as registry:
+            data = registry.read_all()
+    else:
+        data = decrypt_clients_payload(encrypted, Fernet(fernet_key.encode("utf-8")))
+    return {str(k): v for k, v in data.items() if isinstance(v, dict)}
+
+
+def is_chunked_file(path: Path) -> bool:
+    with open(path, "rb") as fp:
+        return is_chunked(fp.read(len(MAGIC)))
+
+
+def read_registry(path: Path, fernet_key: str) -> dict[str, dict[str, str]]:
+    """Clients from ``path``; chunked files are decrypted record by record instead of in one piece."""
+    if not path.exists():
+        raise SecurityError(f"Encrypted clients file not found: {path}")
+    if not is_chunked_file(path):
+        return decrypt_registry(path.read_bytes(), fernet_key)
+    with ChunkedClients(path, fernet_key) as registry:
+        return registry.read_all()
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
 import base64
+from collections.abc import Mapping
 import json
 import os
 from pathlib import Path
 
-from .security import decrypt_clients_file, load_fernet_from_env
+from .clients_snapshot import load_clients_with_snapshot
+from .clients_store import (
+    DEFAULT_CLIENT_CACHE_SIZE,
+    ChunkedClients,
+    LazyClients,
+    is_chunked_file,
+    read_registry,
+)
+from .security import load_key_from_env
+from .startup import PhaseTimer
+from .utils import CatalogIndex, CompanyIndex, normalize_text
 
 
 def load_json(path: Path) -> dict:
@@ -36,7 +47,7 @@ def load_locations(path: Path) -> dict[str, str]:
     return {str(k): str(v) for k, v in data.items()}
 
 
-def load_clients_encrypted(enc_path: Path) -> dict[str, dict[str, str]]:
+def load_clients_encrypted(enc_path: Path) -> Mapping[str, dict[str, str]]:
     clients_json_b64 = (os.getenv("CLIENTS_JSON_B64") or "").strip()
     if clients_json_b64:
         padded = clients_json_b64 + ("=" * (-len(clients_json_b64) % 4))
@@ -49,6 +60,31 @@ def load_clients_encrypted(enc_path: Path) -> dict[str, dict[str, str]]:
             raise ValueError("CLIENTS_JSON_B64 must decode to a JSON object.")
         return {str(k): v for k, v in data.items() if isinstance(v, dict)}
 
-    fernet = load_fernet_from_env("CLIENTS_KEY")
-    data = decrypt_clients_file(enc_path, fernet)
-    return {str(k): v for k, v in data.items() if isinstance(v, dict)}
+    fernet_key = load_key_from_env("CLIENTS_KEY")
+    lazy = (os.getenv("CLIENTS_LAZY") or "1").strip().lower() not in {"0", "false", "no"}
+    if lazy and enc_path.exists() and is_chunked_file(enc_path):
+        # Keys and company names only; full records are decrypted when a session picks one.
+        try:
+            cache_size = int((os.getenv("CLIENTS_CACHE_SIZE") or str(DEFAULT_CLIENT_CACHE_SIZE)).strip())
+        except ValueError as exc:
+            raise ValueError("CLIENTS_CACHE_SIZE must be an integer.") from exc
+        return LazyClients(ChunkedClients(enc_path, fernet_key), cache_size)
+
+    snapshot_path = (os.getenv("CLIENTS_SNAPSHOT_PATH") or "").strip()
+    if snapshot_path and enc_path.exists():
+        return load_clients_with_snapshot(enc_path, fernet_key, Path(snapshot_path))
+    return read_registry(enc_path, fernet_key)
+
+
+def load_catalogs(data_dir: Path, timer: PhaseTimer | None = None) -> dict:
+    timer = timer or PhaseTimer()
+    with timer.phase("catalogs: decrypt clients"):
+        clients = load_clients_encrypted(data_dir / "clients.enc")
+    with timer.phase("catalogs: json + indexes"):
+        aliases = {normalize_text(k): v for k, v in load_aliases(data_dir / "aliases.json").items()}
+        return {
+            "aliases": aliases,
+            "products": CatalogIndex(load_products(data_dir / "products.json")),
+            "locations": CatalogIndex(load_locations(data_dir / "locations.json")),
+            "clients": CompanyIndex(clients, aliases),
+        }
@@ -0,0 +1,138 @@
+﻿from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, field
+import io
+from pathlib import Path
+import re
+import threading
+
+from docx.document import Document
+from docxtpl import DocxTemplate
+from jinja2 import Template
+
+from .metrics import RENDER_PHASE_SECONDS
+from .tracing import span
+
+
+@dataclass
+class CompiledTemplate:
+    path: Path
+    mtime_ns: int
+    size: int
+    blob: bytes
+    # Parsed package, never rendered into; every render works on a deep copy.
+    document: Document
+    body: Template
+    # uri -> relKey -> (compiled template, encoding)
+    parts: dict[str, dict[str, tuple[Template, str]]] = field(default_factory=dict)
+
+
+_TEMPLATE_CACHE: dict[Path, CompiledTemplate] = {}
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+
+def _compile_xml(patched_xml: str) -> Template:
+    # Same preparation as DocxTemplate.render_xml_part() before handing XML to jinja.
+    # Values are XML-escaped: a raw "&" or "<" makes lxml's recovering parser drop
+    # the rest of the document.
+    return Template(re.sub(r"<w:p([ >])", r"\n<w:p\1", patched_xml), autoescape=True)
+
+
+def _compile_template(path: Path, mtime_ns: int, size: int) -> CompiledTemplate:
+    blob = path.read_bytes()
+    tpl = DocxTemplate(io.BytesIO(blob))
+    tpl.init_docx()
+
+    parts: dict[str, dict[str, tuple[Template, str]]] = {}
+    for uri in (DocxTemplate.HEADER_URI, DocxTemplate.FOOTER_URI):
+        compiled_parts: dict[str, tuple[Template, str]] = {}
+        for rel_key, part in tpl.get_headers_footers(uri):
+            xml = tpl.get_part_xml(part)
+            encoding = tpl.get_headers_footers_encoding(xml)
+            compiled_parts[rel_key] = (_compile_xml(tpl.patch_xml(xml)), encoding)
+        parts[uri] = compiled_parts
+
+    return CompiledTemplate(
+        path=path,
+        mtime_ns=mtime_ns,
+        size=size,
+        blob=blob,
+        document=tpl.docx,
+        body=_compile_xml(tpl.patch_xml(tpl.get_xml())),
+        parts=parts,
+    )
+
+
+def load_template(template_path: Path) -> CompiledTemplate:
+    path = Path(template_path).resolve()
+    stat = path.stat()
+    with _TEMPLATE_CACHE_LOCK:
+        cached = _TEMPLATE_CACHE.get(path)
+        if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+        cached = _compile_template(path, stat.st_mtime_ns, stat.st_size)
+        _TEMPLATE_CACHE[path] = cached
+        return cached
+
+
+def clear_template_cache() -> None:
+    with _TEMPLATE_CACHE_LOCK:
+        _TEMPLATE_CACHE.clear()
+
+
+class _PrecompiledDocxTemplate(DocxTemplate):
+    """DocxTemplate that skips unzipping, parsing, XML patching and jinja compilation on render.
+
+    render() mutates the package (body, header/footer parts, properties), so
+    each instance starts from a deep copy of the cached parsed one; with
+    ``docx`` already set, render_init() does not parse the file again.
+    """
+
+    def __init__(self, compiled: CompiledTemplate) -> None:
+        super().__init__(io.BytesIO(compiled.blob))
+        self.compiled = compiled
+        self.docx = copy.deepcopy(compiled.document)
+
+    def _render_compiled(self, template: Template, part, context: dict) -> str:
+        self.current_rendering_part = part
+        dst_xml = template.render(context)
+        dst_xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", dst_xml)
+        dst_xml = (
+            dst_xml.replace("{_{", "{{")
+            .replace("}_}", "}}")
+            .replace("{_%", "{%")
+            .replace("%_}", "%}")
+        )
+        return self.resolve_listing(dst_xml)
+
+    def build_xml(self, context, jinja_env=None):
+        return self._render_compiled(self.compiled.body, self.docx._part, context)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        compiled_parts = self.compiled.parts.get(uri, {})
+        for rel_key, part in self.get_headers_footers(uri):
+            template, encoding = compiled_parts[rel_key]
+            yield rel_key, self._render_compiled(template, part, context).encode(encoding)
+
+
+def render_template(template_path: Path, context: dict) -> _PrecompiledDocxTemplate:
+    tpl = _PrecompiledDocxTemplate(load_template(template_path))
+    tpl.render(context)
+    return tpl
+
+
+def render_docx(template_path: Path, context: dict, output_path: Path) -> None:
+    render_template(template_path, context).save(str(output_path))
+
+
+def render_docx_bytes(template_path: Path, context: dict) -> bytes:
+    with RENDER_PHASE_SECONDS.time(engine="docxtpl", phase="load"), span("render.load", engine="docxtpl"):
+        tpl = _PrecompiledDocxTemplate(load_template(template_path))
+    with RENDER_PHASE_SECONDS.time(engine="docxtpl", phase="render"), span("render.render", engine="docxtpl"):
+        tpl.render(context)
+    with RENDER_PHASE_SECONDS.time(engine="docxtpl", phase="save"), span("render.save", engine="docxtpl") as current:
+        buffer = io.BytesIO()
+        tpl.save(buffer)
+        current.set(bytes=buffer.tell())
+        return buffer.getvalue()
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import re
+import struct
+import threading
+import zipfile
+import zlib
+
+
+DOCUMENT_PART = "word/document.xml"
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+JINJA_MARKERS = ("{{", "{%", "{#")
+# Characters docxtpl turns into runs/breaks (see DocxTemplate.resolve_listing).
+LISTING_CHARS = frozenset("\a\t\n\f")
+
+
+class UnsupportedTemplateError(ValueError):
+    """Raised when a template uses more than flat {{ name }} placeholders."""
+
+
+@dataclass(frozen=True)
+class _ZipMember:
+    name: bytes
+    flag_bits: int
+    compress_type: int
+    dos_time: int
+    dos_date: int
+    crc: int
+    compress_size: int
+    file_size: int
+    external_attr: int
+    data: bytes
+
+
+@dataclass(frozen=True)
+class SpliceTemplate:
+    path: Path
+    mtime_ns: int
+    size: int
+    members: tuple[_ZipMember, ...]
+    document_index: int
+    segments: tuple[bytes, ...]
+    names: tuple[str, ...]
+
+    def supports(self, context: dict) -> bool:
+        for name in self.names:
+            value = context.get(name)
+            if value is not None and not LISTING_CHARS.isdisjoint(str(value)):
+                return False
+        return True
+
+    def render_document_xml(self, context: dict) -> bytes:
+        pieces = [self.segments[0]]
+        for name, segment in zip(self.names, self.segments[1:]):
+            value = context.get(name)
+            if value is not None:
+                pieces.append(_escape(str(value)).encode("utf-8"))
+            pieces.append(segment)
+        return b"".join(pieces)
+
+    def render(self, context: dict) -> bytes:
+        return self.package(self.render_document_xml(context))
+
+    def package(self, xml: bytes) -> bytes:
+        """Build the DOCX archive around a rendered document.xml."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        compressed = compressor.compress(xml) + compressor.flush()
+        source = self.members[self.document_index]
+        document = _ZipMember(
+            name=source.name,
+            flag_bits=source.flag_bits & 0x800,
+            compress_type=zipfile.ZIP_DEFLATED,
+            dos_time=source.dos_time,
+            dos_date=source.dos_date,
+            crc=zlib.crc32(xml),
+            compress_size=len(compressed),
+            file_size=len(xml),
+            external_attr=source.external_attr,
+            data=compressed,
+        )
+        members = list(self.members)
+        members[self.document_index] = document
+        return _write_zip(members)
+
+
+def _escape(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _read_member(fp, info: zipfile.ZipInfo) -> _ZipMember:
+    fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+    name_len, extra_len = header[-2], header[-1]
+    fp.seek(info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+    year, month, day, hour, minute, second = info.date_time
+    return _ZipMember(
+        name=info.filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437"),
+        # Sizes and CRC are written up front, so no data descriptor is needed.
+        flag_bits=info.flag_bits & ~0x8,
+        compress_type=info.compress_type,
+        dos_time=(hour << 11) | (minute << 5) | (second // 2),
+        dos_date=((year - 1980) << 9) | (month << 5) | day,
+        crc=info.CRC,
+        compress_size=info.compress_size,
+        file_size=info.file_size,
+        external_attr=info.external_attr,
+        data=fp.read(info.compress_size),
+    )
+
+
+def _write_zip(members: list[_ZipMember]) -> bytes:
+    body: list[bytes] = []
+    central: list[bytes] = []
+    offset = 0
+    for member in members:
+        local = struct.pack(
+            zipfile.structFileHeader,
+            zipfile.stringFileHeader,
+            20,
+            0,
+            member.flag_bits,
+            member.compress_type,
+            member.dos_time,
+            member.dos_date,
+            member.crc,
+            member.compress_size,
+            member.file_size,
+            len(member.name),
+            0,
+        )
+        central.append(
+            struct.pack(
+                zipfile.structCentralDir,
+                zipfile.stringCentralDir,
+                20,
+                0,
+                20,
+                0,
+                member.flag_bits,
+                member.compress_type,
+                member.dos_time,
+                member.dos_date,
+                member.crc,
+                member.compress_size,
+                member.file_size,
+                len(member.name),
+                0,
+                0,
+                0,
+                0,
+                member.external_attr,
+                offset,
+            )
+            + member.name
+        )
+        body.extend((local, member.name, member.data))
+        offset += len(local) + len(member.name) + len(member.data)
+
+    central_blob = b"".join(central)
+    end = struct.pack(
+        zipfile.structEndArchive,
+        zipfile.stringEndArchive,
+        0,
+        0,
+        len(members),
+        len(members),
+        len(central_blob),
+        offset,
+        0,
+    )
+    return b"".join(body) + central_blob + end
+
+
+def _compile_splice_template(path: Path, mtime_ns: int, size: int) -> SpliceTemplate:
+    with path.open("rb") as fp, zipfile.ZipFile(fp) as archive:
+        infos = archive.infolist()
+        names = [info.filename for info in infos]
+        if DOCUMENT_PART not in names:
+            raise UnsupportedTemplateError(f"{path.name}: {DOCUMENT_PART} is missing.")
+
+        for info in infos:
+            if info.filename == DOCUMENT_PART or not info.filename.endswith(".xml"):
+                continue
+            payload = archive.read(info.filename)
+            if any(marker.encode() in payload for marker in JINJA_MARKERS):
+                raise UnsupportedTemplateError(
+                    f"{path.name}: placeholders outside {DOCUMENT_PART} ({info.filename})."
+                )
+
+        document_xml = archive.read(DOCUMENT_PART).decode("utf-8")
+        members = tuple(_read_member(fp, info) for info in infos)
+
+    # Reuse docxtpl's cleanup so placeholders split across runs are merged exactly
+    # the way the docxtpl engine sees them.
+    from docxtpl import DocxTemplate
+
+    patched = DocxTemplate(str(path)).patch_xml(document_xml)
+    parts = PLACEHOLDER_RE.split(patched)
+    statics = parts[0::2]
+    for static in statics:
+        if any(marker in static for marker in JINJA_MARKERS):
+            raise UnsupportedTemplateError(
+                f"{path.name}: only flat {{{{ name }}}} placeholders are supported."
+            )
+    # docxtpl un-escapes these sequences in the rendered output.
+    statics = [
+        static.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+        for static in statics
+    ]
+
+    return SpliceTemplate(
+        path=path,
+        mtime_ns=mtime_ns,
+        size=size,
+        members=members,
+        document_index=names.index(DOCUMENT_PART),
+        segments=tuple(static.encode("utf-8") for static in statics),
+        names=tuple(parts[1::2]),
+    )
+
+
+_SPLICE_CACHE: dict[Path, SpliceTemplate] = {}
+_SPLICE_CACHE_LOCK = threading.Lock()
+
+
+def load_splice_template(template_path: Path) -> SpliceTemplate:
+    path = Path(template_path).resolve()
+    stat = path.stat()
+    with _SPLICE_CACHE_LOCK:
+        cached = _SPLICE_CACHE.get(path)
+        if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+        cached = _compile_splice_template(path, stat.st_mtime_ns, stat.st_size)
+        _SPLICE_CACHE[path] = cached
+        return cached
+
+
+def clear_splice_cache() -> None:
+    with _SPLICE_CACHE_LOCK:
+        _SPLICE_CACHE.clear()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable
+
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 24 * 3600.0
+
+
+def template_version(template_path: Path) -> str:
+    stat = template_path.stat()
+    return f"{template_path.name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def document_key(template_path: Path, context: dict[str, str], filename: str) -> str:
+    """Content address of a rendered document: template version, context and file name."""
+    payload = json.dumps(
+        [template_version(template_path), filename, context],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DocumentFileCache:
+    """LRU of Telegram ``file_id`` values for documents already uploaded once.
+
+    Sending a cached ``file_id`` skips both rendering and the upload. Entries
+    expire after ``ttl`` seconds and the least recently used one is evicted when
+    ``max_entries`` is reached. ``max_entries=0`` disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> DocumentFileCache:
+        try:
+            max_entries = int((os.getenv("DOCUMENT_CACHE_SIZE") or str(DEFAULT_MAX_ENTRIES)).strip())
+            ttl = float((os.getenv("DOCUMENT_CACHE_TTL") or str(DEFAULT_TTL)).strip())
+        except ValueError as exc:
+            raise RuntimeError("DOCUMENT_CACHE_SIZE and DOCUMENT_CACHE_TTL must be numbers.") from exc
+        if max_entries < 0 or ttl <= 0:
+            raise RuntimeError("DOCUMENT_CACHE_SIZE must be >= 0 and DOCUMENT_CACHE_TTL > 0.")
+        return cls(max_entries, ttl)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, file_id: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (file_id, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Iterable
+import heapq
+from operator import itemgetter
+import re
+
+
+WORD_RE = re.compile(r"[\w-]+")
+MIN_WORD_LENGTH = 4
+MAX_CANDIDATES = 24
+# Upper bound on posting entries scanned per query; rare trigrams are read first.
+POSTING_BUDGET = 1024
+
+
+def max_distance_for(query: str) -> int:
+    """Edit budget by query length: short keys are too ambiguous to correct."""
+    length = len(query)
+    if length < 4:
+        return 0
+    if length < 6:
+        return 1
+    if length < 11:
+        return 2
+    return 3
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Optimal-string-alignment distance, giving up once it exceeds ``max_distance``.
+
+    Returns ``max_distance + 1`` for anything farther than the bound.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    return _osa_distance(_char_masks(a), len(a), b, max_distance)
+
+
+def _char_masks(pattern: str) -> dict[str, int]:
+    masks: dict[str, int] = {}
+    for position, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def _osa_distance(masks: dict[str, int], length: int, text: str, max_distance: int) -> int:
+    """Bit-parallel OSA distance (Hyyrö, 2003) of ``text`` to a pattern given by its masks.
+
+    A DP column is kept as two bit vectors, so each character of ``text`` costs a
+    handful of integer operations instead of a row of the matrix.
+    """
+    limit = max_distance + 1
+    if not length:
+        return min(len(text), limit)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    vp, vn, d0, prev_mask = full, 0, 0, 0
+    distance = length
+    remaining = len(text)
+    for char in text:
+        mask = masks.get(char, 0)
+        transposed = ((~d0 & mask) << 1) & prev_mask
+        d0 = ((((mask & vp) + vp) ^ vp) | mask | vn | transposed) & full
+        hp = vn | (~(d0 | vp) & full)
+        hn = d0 & vp
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(d0 | hp) & full)
+        vn = hp & d0
+        prev_mask = mask
+        remaining -= 1
+        # Each remaining character lowers the distance by at most one.
+        if distance - remaining > max_distance:
+            return limit
+    return distance if distance <= max_distance else limit
+
+
+def _padded_trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def match_terms(*texts: str) -> set[str]:
+    """Terms worth matching a typo against: the whole text and its longer words."""
+    terms: set[str] = set()
+    for text in texts:
+        if not text:
+            continue
+        terms.add(text)
+        terms.update(word for word in WORD_RE.findall(text) if len(word) >= MIN_WORD_LENGTH)
+    return terms
+
+
+class FuzzyIndex:
+    """Typo-tolerant lookup over catalog positions.
+
+    Each position owns a few normalized terms. A query collects candidate terms
+    sharing padded trigrams with it, only among terms whose length is within the
+    edit budget, keeps the ``MAX_CANDIDATES`` with the most overlap, and scores
+    those with a bounded Damerau-Levenshtein distance. Trigrams are read rarest
+    first and scanning stops after ``POSTING_BUDGET`` postings, so neither the
+    postings read nor the candidates scored grow with the catalog.
+    """
+
+    def __init__(self, terms_by_position: Iterable[Iterable[str]]) -> None:
+        self._terms: list[str] = []
+        self._lengths: list[int] = []
+        self._owners: list[int] = []
+        self._grams: dict[str, list[int]] = {}
+        for position, terms in enumerate(terms_by_position):
+            for term in terms:
+                term_id = len(self._terms)
+                self._terms.append(term)
+                self._lengths.append(len(term))
+                self._owners.append(position)
+                for gram in _padded_trigrams(term):
+                    self._grams.setdefault(gram, []).append(term_id)
+        # Postings ordered by term length, so a query slices out the lengths it can reach.
+        self._gram_lengths: dict[str, list[int]] = {}
+        for gram, posting in self._grams.items():
+            posting.sort(key=self._lengths.__getitem__)
+            self._gram_lengths[gram] = [self._lengths[term_id] for term_id in posting]
+
+    def search(self, query: str, limit: int = 10) -> list[int]:
+        max_distance = max_distance_for(query)
+        if max_distance == 0:
+            return []
+
+        length = len(query)
+        ranges = []
+        for gram in _padded_trigrams(query):
+            gram_lengths = self._gram_lengths.get(gram)
+            if gram_lengths is None:
+                continue
+            # No edit budget covers a length difference larger than itself.
+            start = bisect_left(gram_lengths, length - max_distance)
+            end = bisect_right(gram_lengths, length + max_distance, start)
+            if start < end:
+                ranges.append((end - start, gram, start, end))
+        ranges.sort()
+
+        overlap: Counter[int] = Counter()
+        scanned = 0
+        read = 0
+        for size, gram, start, end in ranges:
+            if scanned and scanned + size > POSTING_BUDGET:
+                break
+            overlap.update(self._grams[gram][start:end])
+            scanned += size
+            read += 1
+        # A single edit (at worst a transposition) breaks at most four query trigrams.
+        min_shared = max(1, read - 4 * max_distance)
+        masks = _char_masks(query)
+        best: dict[int, tuple[int, int]] = {}
+        for term_id, shared in heapq.nlargest(MAX_CANDIDATES, overlap.items(), key=itemgetter(1)):
+            if shared < min_shared:
+                break
+            distance = _osa_distance(masks, length, self._terms[term_id], max_distance)
+            if distance > max_distance:
+                continue
+            position = self._owners[term_id]
+            rank = (distance, -shared)
+            if position not in best or rank < best[position]:
+                best[position] = rank
+
+        ranked = sorted(best, key=lambda position: (best[position], position))
+        return ranked[:limit]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+from typing import Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 75.0
+# Time from the first byte of a request until its headers and body are read in full.
+REQUEST_TIMEOUT = 10.0
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes = b""
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+class HttpServer:
+    """Minimal HTTP/1.1 server on the running event loop.
+
+    Enough for health checks, metrics and Telegram webhook deliveries: exact-path
+    routing, Content-Length bodies and keep-alive, no chunked requests. An idle
+    keep-alive connection may wait ``KEEP_ALIVE_TIMEOUT`` for its next request,
+    but once a request starts it must arrive in full within ``request_timeout``,
+    so slowly trickled headers or bodies cannot hold connections open.
+    """
+
+    def __init__(self, host: str, port: int, request_timeout: float = REQUEST_TIMEOUT) -> None:
+        self.host = host
+        self.port = port
+        self.request_timeout = request_timeout
+        self._routes: dict[tuple[str, str], Handler] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        self._routes[(method.upper(), path)] = handler
+
+    async def start(self) -> None:
+        # The stream limit makes readuntil() give up on oversized headers without buffering them.
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_SIZE
+        )
+        sockets = self._server.sockets or []
+        if sockets and self.port == 0:
+            self.port = sockets[0].getsockname()[1]
+        logger.info("HTTP server listening on %s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request | None:
+        try:
+            first = await asyncio.wait_for(reader.readexactly(1), KEEP_ALIVE_TIMEOUT)
+        except asyncio.IncompleteReadError:
+            return None
+        deadline = asyncio.get_running_loop().time() + self.request_timeout
+        try:
+            head = first + await self._read_within(reader.readuntil(b"\r\n\r\n"), deadline)
+        except asyncio.LimitOverrunError as exc:
+            raise HttpError(400) from exc
+        if len(head) > MAX_HEADER_SIZE:
+            raise HttpError(400)
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _version = lines[0].split(" ", 2)
+        except ValueError as exc:
+            raise HttpError(400) from exc
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        raw_length = headers.get("content-length") or "0"
+        if not raw_length.isdecimal():
+            raise HttpError(400)
+        length = int(raw_length)
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413)
+        body = await self._read_within(reader.readexactly(length), deadline) if length else b""
+        return Request(method.upper(), target.split("?", 1)[0], headers, body)
+
+    @staticmethod
+    async def _read_within(read: Awaitable[bytes], deadline: float) -> bytes:
+        try:
+            return await asyncio.wait_for(read, max(0.0, deadline - asyncio.get_running_loop().time()))
+        except asyncio.TimeoutError as exc:
+            raise HttpError(408) from exc
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return Response(405)
+            return Response(404)
+        try:
+            return await handler(request)
+        except Exception:
+            logger.exception("HTTP handler failed for %s %s", request.method, request.path)
+            return Response(500)
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        headers = {
+            "Content-Type": response.content_type,
+            "Content-Length": str(len(response.body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **response.headers,
+        }
+        head = f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + response.body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as exc:
+                    self._write_response(writer, Response(exc.status), keep_alive=False)
+                    await writer.drain()
+                    return
+                except (asyncio.TimeoutError, ValueError):
+                    return
+                if request is None:
+                    return
+
+                response = await self._dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                self._write_response(writer, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
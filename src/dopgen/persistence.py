@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+import json
+import logging
+from pathlib import Path
+import sqlite3
+import time
+from typing import Callable, Optional
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from .records import ClientRecord, intern_text
+
+
+logger = logging.getLogger(__name__)
+
+DATE_KEYS = frozenset({"current_date", "delivery_date", "pay_date"})
+# Full client records are restored from the catalog by company_key.
+DROPPED_KEYS = frozenset({"client_data"})
+# Catalog keys and choices; interned so restored sessions share the catalogs' strings.
+INTERNED_KEYS = frozenset({"company_key", "product_key", "location_key", "payment_type", "delivery_type"})
+DEFAULT_SESSION_TTL = 7 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    conv_key TEXT NOT NULL,
+    state INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, conv_key)
+);
+"""
+
+
+def encode_user_data(data: dict) -> str:
+    compact = {}
+    for key, value in data.items():
+        if key in DROPPED_KEYS:
+            continue
+        if key in DATE_KEYS and isinstance(value, date):
+            value = value.isoformat()
+        compact[key] = value
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_user_data(raw: str, resolve_client: Callable[[str], Optional[ClientRecord]]) -> dict | None:
+    """Session stored by ``encode_user_data``, or ``None`` if its client is no longer in the registry."""
+    data = json.loads(raw)
+    for key in DATE_KEYS & data.keys():
+        data[key] = date.fromisoformat(data[key])
+    for key in INTERNED_KEYS & data.keys():
+        data[key] = intern_text(data[key])
+    company_key = data.get("company_key")
+    if company_key is not None:
+        client = resolve_client(company_key)
+        if client is None:
+            return None
+        data["client_data"] = client
+    return data
+
+
+class SqlitePersistence(BasePersistence[dict, dict, dict]):
+    """Stores user_data and conversation states in SQLite, one row per user/conversation.
+
+    Rows hold only compact values (client key instead of the client record, ISO
+    dates). Writes handed over by the application in one persistence run are
+    committed together in a single transaction. A session that cannot be
+    restored (unreadable, or its client was removed) is discarded together with
+    the user's conversation state, so nobody resumes a step with half the data.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        resolve_client: Callable[[str], Optional[ClientRecord]],
+        update_interval: float = 1,
+        session_ttl: float = DEFAULT_SESSION_TTL,
+    ) -> None:
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.session_ttl = session_ttl
+        self._resolve_client = resolve_client
+        self._conn: sqlite3.Connection | None = None
+        self._pending_users: dict[int, str | None] = {}
+        self._pending_conversations: dict[tuple[str, str], int | None] = {}
+        self._commit_scheduled = False
+        self._discarded_users: set[int] = set()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            cutoff = time.time() - self.session_ttl
+            conn.execute("DELETE FROM user_data WHERE updated_at < ?", (cutoff,))
+            conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _schedule_commit(self) -> None:
+        if self._commit_scheduled:
+            return
+        self._commit_scheduled = True
+        asyncio.get_running_loop().call_soon(self._commit)
+
+    def _commit(self) -> None:
+        self._commit_scheduled = False
+        if not self._pending_users and not self._pending_conversations:
+            return
+        users, self._pending_users = self._pending_users, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        now = time.time()
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?)",
+                    [(user_id, raw, now) for user_id, raw in users.items() if raw is not None],
+                )
+                self.conn.executemany(
+                    "DELETE FROM user_data WHERE user_id = ?",
+                    [(user_id,) for user_id, raw in users.items() if raw is None],
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO conversations (name, conv_key, state, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(name, key, state, now) for (name, key), state in conversations.items() if state is not None],
+                )
+                self.conn.executemany(
+                    "DELETE FROM conversations WHERE name = ? AND conv_key = ?",
+                    [(name, key) for (name, key), state in conversations.items() if state is None],
+                )
+        except sqlite3.Error:
+            logger.exception("Failed to persist %d user rows and %d conversations", len(users), len(conversations))
+
+    async def get_user_data(self) -> dict[int, dict]:
+        started = time.perf_counter()
+        result: dict[int, dict] = {}
+        for user_id, raw in self.conn.execute("SELECT user_id, data FROM user_data").fetchall():
+            try:
+                data = decode_user_data(raw, self._resolve_client)
+            except (ValueError, TypeError):
+                logger.warning("Dropping unreadable stored session for user %s", user_id)
+                data = None
+            else:
+                if data is None:
+                    logger.warning("Dropping stored session for user %s: its client is no longer registered", user_id)
+            if data is None:
+                self._discarded_users.add(user_id)
+                self._pending_users[user_id] = None
+                self._schedule_commit()
+            else:
+                result[user_id] = data
+        logger.info("Restored %d user sessions in %.1f ms", len(result), (time.perf_counter() - started) * 1000)
+        return result
+
+    async def get_conversations(self, name: str) -> dict[tuple, object]:
+        # The application restores user_data first, so discarded sessions are known here.
+        result: dict[tuple, object] = {}
+        for conv_key, state in self.conn.execute(
+            "SELECT conv_key, state FROM conversations WHERE name = ?", (name,)
+        ).fetchall():
+            key = tuple(json.loads(conv_key))
+            if self._discarded_users.intersection(key):
+                self._pending_conversations[(name, conv_key)] = None
+                self._schedule_commit()
+            else:
+                result[key] = state
+        return result
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        conv_key = json.dumps(list(key), separators=(",", ":"))
+        self._pending_conversations[(name, conv_key)] = new_state if isinstance(new_state, int) else None
+        self._schedule_commit()
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._pending_users[user_id] = encode_user_data(data) if data else None
+        self._schedule_commit()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending_users[user_id] = None
+        self._schedule_commit()
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        return
+
+    async def update_bot_data(self, data: dict) -> None:
+        return
+
+    async def update_callback_data(self, data) -> None:
+        return
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        return
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        return
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        return
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        return
+
+    async def flush(self) -> None:
+        self._commit()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
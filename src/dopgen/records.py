@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+import sys
+from typing import Any
+
+
+def intern_text(value: Any) -> str:
+    """``str(value)`` shared with every equal string interned before (``None`` becomes "")."""
+    return sys.intern("" if value is None else str(value))
+
+
+@dataclass(frozen=True, slots=True)
+class ClientRecord:
+    """One client of the registry; the fields templates and the summary read.
+
+    Values are interned, so repeated ones (director positions, contract
+    suffixes, initials) are stored once per process.
+    """
+
+    company_name: str = ""
+    contract: str = ""
+    director_position: str = ""
+    director_fio: str = ""
+    initials: str = ""
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> ClientRecord:
+        return cls(*(intern_text(data.get(name, "")) for name in _CLIENT_FIELDS))
+
+
+_CLIENT_FIELDS = tuple(field.name for field in fields(ClientRecord))
+
+
+def client_record(value: ClientRecord | Mapping[str, Any]) -> ClientRecord:
+    return value if isinstance(value, ClientRecord) else ClientRecord.from_mapping(value)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+import time
+from typing import Callable
+
+from .data_loaders import load_catalogs
+
+
+logger = logging.getLogger(__name__)
+
+WATCHED_PATTERNS = ("*.json", "clients.enc")
+
+
+def validate_catalogs(catalogs: dict) -> None:
+    for name in ("aliases", "products", "locations", "clients"):
+        if name not in catalogs:
+            raise ValueError(f"Catalog '{name}' is missing.")
+    for name in ("products", "locations", "clients"):
+        if not len(catalogs[name]):
+            raise ValueError(f"Catalog '{name}' is empty.")
+    clients = catalogs["clients"]
+    for key in clients:
+        # company_name comes from the index, so lazily decrypted clients stay encrypted here.
+        if not clients.company_name(key).strip():
+            raise ValueError(f"Client '{key}' has no company_name.")
+
+
+def catalog_sizes(catalogs: dict) -> dict[str, int]:
+    return {name: len(catalogs[name]) for name in ("aliases", "products", "locations", "clients")}
+
+
+class CatalogReloader:
+    """Reloads catalogs off the event loop and hands complete snapshots to ``on_swap``.
+
+    Loading, validation and index building happen in a worker thread on a fresh
+    dict; the caller only ever swaps one reference, so a handler sees either the
+    old catalogs or the new ones, never a mix.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        on_swap: Callable[[dict], None],
+        loader: Callable[[Path], dict] = load_catalogs,
+    ) -> None:
+        self.data_dir = data_dir
+        self._on_swap = on_swap
+        self._loader = loader
+        self._lock = asyncio.Lock()
+        self._stamps = self._snapshot()
+
+    def _snapshot(self) -> dict[Path, tuple[int, int]]:
+        stamps: dict[Path, tuple[int, int]] = {}
+        for pattern in WATCHED_PATTERNS:
+            for path in self.data_dir.glob(pattern):
+                stat = path.stat()
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _load(self) -> dict:
+        catalogs = self._loader(self.data_dir)
+        validate_catalogs(catalogs)
+        return catalogs
+
+    async def reload(self, reason: str) -> dict:
+        async with self._lock:
+            stamps = self._snapshot()
+            started = time.perf_counter()
+            catalogs = await asyncio.get_running_loop().run_in_executor(None, self._load)
+            self._on_swap(catalogs)
+            self._stamps = stamps
+            logger.info(
+                "Catalogs reloaded (%s) in %.1f ms: %s",
+                reason,
+                (time.perf_counter() - started) * 1000,
+                ", ".join(f"{name}={size}" for name, size in catalog_sizes(catalogs).items()),
+            )
+            return catalogs
+
+    def changed_files(self) -> list[Path]:
+        current = self._snapshot()
+        return sorted(
+            path for path in set(current) | set(self._stamps) if current.get(path) != self._stamps.get(path)
+        )
+
+    async def watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            changed = self.changed_files()
+            if not changed:
+                continue
+            names = ", ".join(path.name for path in changed)
+            try:
+                await self.reload(f"changed: {names}")
+            except Exception:
+                # Keep serving the previous catalogs; retry only after the next change.
+                self._stamps = self._snapshot()
+                logger.exception("Catalog reload failed, keeping previous catalogs")
+
@@ -1,9 +1,17 @@
 ﻿from __future__ import annotations
 
+from collections import OrderedDict
+from datetime import date
+import hashlib
+import json
 from pathlib import Path
+import threading
+import time
 
-from docxtpl import DocxTemplate
-
+from .fast_render import load_splice_template
+from .metrics import RENDER_PHASE_SECONDS
+from .records import ClientRecord
+from .tracing import span
 from .ru_dates import (
     format_current_date,
     format_date_long_no_suffix,
@@ -21,6 +29,9 @@ TEMPLATE_MAP = {
     ("deferment", "delivery"): Path("templates/deferment_delivery.docx"),
 }
 
+RENDER_ENGINES = ("docxtpl", "fast")
+DEFAULT_RENDER_CACHE_BYTES = 32 * 1024 * 1024
+
 BASIS_MAP = {
     "pickup": "франко-автотранспортное средство Покупателя на складе Поставщика.",
     "delivery": "франко-автотранспортное средство Поставщика на складе Покупателя.",
@@ -35,17 +46,17 @@ def choose_template(payment_type: str, delivery_type: str) -> Path:
 
 
 def build_context(collected: dict, catalogs: dict) -> dict[str, str]:
-    client = collected["client_data"]
+    client: ClientRecord = collected["client_data"]
     product_key = collected["product_key"]
     location_key = collected["location_key"]
 
     context: dict[str, str] = {
         "dop_num": collected["dop_num"],
-        "contract": normalize_contract(client.get("contract", "")),
+        "contract": normalize_contract(client.contract),
         "current_date": format_current_date(collected["current_date"]),
-        "company_name": client.get("company_name", ""),
-        "director_position": client.get("director_position", ""),
-        "director_fio": client.get("director_fio", ""),
+        "company_name": client.company_name,
+        "director_position": client.director_position,
+        "director_fio": client.director_fio,
         "delivery_month_year": format_delivery_month_year(
             collected["delivery_date"], collected["delivery_type"]
         ),
@@ -55,7 +66,7 @@ def build_context(collected: dict, catalogs: dict) -> dict[str, str]:
         "basis_full": BASIS_MAP[collected["delivery_type"]],
         "location_full": catalogs["locations"][location_key],
         "pay_date": format_pay_date(collected["pay_date"]),
-        "initials": client.get("initials", ""),
+        "initials": client.initials,
     }
 
     if collected["delivery_type"] == "delivery":
@@ -72,7 +83,201 @@ def build_output_filename(collected: dict) -> str:
     )
 
 
+class RenderCache:
+    """LRU of rendered DOCX bytes bounded by their total size.
+
+    Keys cover the template file, a hash of its content, the engine and the
+    context serialized with sorted keys, so an edited template or any changed
+    value misses. Documents larger than the whole budget are not stored.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_RENDER_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._digests: dict[Path, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def template_digest(self, template_path: Path) -> str:
+        path = Path(template_path).resolve()
+        stat = path.stat()
+        with self._lock:
+            cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        # Hashed outside the lock; racing threads compute the same value.
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        with self._lock:
+            self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def key(self, template_path: Path, context: dict, engine: str) -> str:
+        payload = json.dumps(
+            [str(Path(template_path).resolve()), self.template_digest(template_path), engine, context],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = payload
+            self.current_bytes += len(payload)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and self.current_bytes > self.max_bytes:
+            _, payload = self._entries.popitem(last=False)
+            self.current_bytes -= len(payload)
+            self.evictions += 1
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_RENDER_CACHE = RenderCache()
+
+
+def configure_render_cache(max_bytes: int) -> None:
+    """Set the byte budget of the rendered-document cache; 0 disables it."""
+    _RENDER_CACHE.resize(max_bytes)
+
+
+def render_cache_stats() -> dict[str, float]:
+    return _RENDER_CACHE.stats()
+
+
+def clear_render_cache() -> None:
+    _RENDER_CACHE.clear()
+
+
+def render_docx_bytes(template_path: Path, context: dict, engine: str = "docxtpl") -> bytes:
+    if engine not in RENDER_ENGINES:
+        raise ValueError(f"Unsupported render engine: {engine}")
+    if _RENDER_CACHE.max_bytes <= 0:
+        return _render_docx_bytes(template_path, context, engine)
+
+    with span("render.cache_lookup") as current:
+        key = _RENDER_CACHE.key(template_path, context, engine)
+        document = _RENDER_CACHE.get(key)
+        current.set(hit=document is not None)
+    if document is None:
+        document = _render_docx_bytes(template_path, context, engine)
+        _RENDER_CACHE.put(key, document)
+    return document
+
+
+def _render_docx_bytes(template_path: Path, context: dict, engine: str) -> bytes:
+    if engine == "fast":
+        with RENDER_PHASE_SECONDS.time(engine="fast", phase="load"), span("render.load", engine="fast"):
+            splice = load_splice_template(template_path)
+        # Values with tabs/line breaks need docxtpl's run splitting.
+        if splice.supports(context):
+            with RENDER_PHASE_SECONDS.time(engine="fast", phase="render"), span("render.render", engine="fast"):
+                xml = splice.render_document_xml(context)
+            with RENDER_PHASE_SECONDS.time(engine="fast", phase="save"), span("render.save", engine="fast") as current:
+                document = splice.package(xml)
+                current.set(bytes=len(document))
+                return document
+
+    # docxtpl pulls in jinja2, lxml and python-docx (~100 ms); keep it off the startup path.
+    from .docx_render import render_docx_bytes as render_with_docxtpl
+
+    return render_with_docxtpl(template_path, context)
+
+
 def render_docx(template_path: Path, context: dict, output_path: Path) -> None:
-    tpl = DocxTemplate(str(template_path))
-    tpl.render(context)
-    tpl.save(str(output_path))
+    from .docx_render import render_docx as render_with_docxtpl
+
+    render_with_docxtpl(template_path, context, output_path)
+
+
+def warm_render_stack() -> None:
+    """Import docxtpl (jinja2, lxml, python-docx) ahead of the first render."""
+    from . import docx_render  # noqa: F401
+
+
+WARM_UP_CLIENT = ClientRecord(
+    company_name="ООО «Прогрев»",
+    contract="№ 1/2024",
+    director_position="Генерального директора",
+    director_fio="Иванова Ивана Ивановича",
+    initials="И.И. Иванов",
+)
+
+
+def warm_up_templates(base_dir: Path, catalogs: dict, engine: str = "docxtpl") -> list[tuple[Path, float]]:
+    """Render every template once with synthetic data and discard the output.
+
+    Loads and compiles all templates so the first real document does not pay for
+    it. Bypasses the rendered-document cache. Raises RuntimeError naming every
+    template that is missing or fails to render.
+    """
+    today = date.today()
+    timings: list[tuple[Path, float]] = []
+    failures: list[str] = []
+    for (payment_type, delivery_type), template_rel in TEMPLATE_MAP.items():
+        collected = {
+            "company_key": "прогрев",
+            "client_data": WARM_UP_CLIENT,
+            "dop_num": "1",
+            "payment_type": payment_type,
+            "delivery_type": delivery_type,
+            "current_date": today,
+            "delivery_date": today,
+            "pay_date": today,
+            "product_key": next(iter(catalogs["products"])),
+            "tons": 1,
+            "price": 1,
+            "location_key": next(iter(catalogs["locations"])),
+            "unload_address": "г. Москва",
+        }
+        started = time.perf_counter()
+        try:
+            _render_docx_bytes(base_dir / template_rel, build_context(collected, catalogs), engine)
+        except Exception as exc:
+            failures.append(f"{template_rel}: {exc}")
+            continue
+        timings.append((template_rel, time.perf_counter() - started))
+    if failures:
+        raise RuntimeError("Template warm-up failed: " + "; ".join(failures))
+    return timings
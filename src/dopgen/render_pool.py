@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import contextvars
+import logging
+import os
+import threading
+from typing import Any, Callable, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_TIMEOUT = 30.0
+
+
+class RenderPoolBusy(RuntimeError):
+    """Raised when the render queue is full and a job cannot be accepted."""
+
+
+def _env_number(name: str, default: float, cast: Callable[[str], Any]) -> Any:
+    raw = (os.getenv(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be a number, got {raw!r}.") from exc
+    if value <= 0:
+        raise RuntimeError(f"{name} must be greater than 0.")
+    return value
+
+
+class RenderPool:
+    """Bounded executor for CPU-bound rendering jobs driven from asyncio handlers.
+
+    At most ``workers`` jobs run at once and at most ``queue_size`` more wait for
+    a free worker; anything beyond that is rejected with RenderPoolBusy. A job
+    that outlives ``timeout`` is abandoned by the caller, but keeps its slot until
+    the worker actually finishes so the bound stays honest.
+
+    With ``kind="process"`` jobs run in worker processes: their render cache,
+    cache counters, render histograms and tracing spans stay in those processes,
+    so /metrics and the trace file do not see them, and start-up warm-up only
+    warms the main process or the one worker that ran it.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        kind: str = "thread",
+    ) -> None:
+        if kind == "thread":
+            executor: Executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        elif kind == "process":
+            executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            raise ValueError(f"Unsupported render pool kind: {kind}")
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.kind = kind
+        self._executor = executor
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> RenderPool:
+        kind = (os.getenv("RENDER_POOL_KIND") or "thread").strip().lower()
+        if kind not in {"thread", "process"}:
+            raise RuntimeError("RENDER_POOL_KIND must be 'thread' or 'process'.")
+        if kind == "process":
+            logger.warning(
+                "RENDER_POOL_KIND=process: render cache stats, render metrics and traces stay in the "
+                "worker processes and are not exported; template warm-up covers a single process only."
+            )
+        return cls(
+            workers=_env_number("RENDER_WORKERS", DEFAULT_WORKERS, int),
+            queue_size=_env_number("RENDER_QUEUE_SIZE", DEFAULT_QUEUE_SIZE, int),
+            timeout=_env_number("RENDER_TIMEOUT", DEFAULT_TIMEOUT, float),
+            kind=kind,
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def _release(self, _future: Future | None = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise RenderPoolBusy(
+                    f"Render queue is full ({self._pending}/{self.capacity} jobs)."
+                )
+            self._pending += 1
+
+        try:
+            if self.kind == "thread":
+                # Carry context variables (e.g. the current tracing span) into the worker.
+                future = self._executor.submit(contextvars.copy_context().run, fn, *args)
+            else:
+                future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
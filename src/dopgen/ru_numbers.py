@@ -1,14 +1,83 @@
 ﻿from __future__ import annotations
 
-from num2words import num2words
+from functools import lru_cache
+
+
+ONES_MASCULINE = ("", "один", "два", "три", "четыре", "пять", "шесть", "семь", "восемь", "девять")
+ONES_FEMININE = ("", "одна", "две", "три", "четыре", "пять", "шесть", "семь", "восемь", "девять")
+TEENS = (
+    "десять",
+    "одиннадцать",
+    "двенадцать",
+    "тринадцать",
+    "четырнадцать",
+    "пятнадцать",
+    "шестнадцать",
+    "семнадцать",
+    "восемнадцать",
+    "девятнадцать",
+)
+TENS = ("", "", "двадцать", "тридцать", "сорок", "пятьдесят", "шестьдесят", "семьдесят", "восемьдесят", "девяносто")
+HUNDREDS = ("", "сто", "двести", "триста", "четыреста", "пятьсот", "шестьсот", "семьсот", "восемьсот", "девятьсот")
+
+# Scale words per triad: (one, few, many) forms and whether the triad counts in the feminine.
+SCALES = (
+    (("", "", ""), False),
+    (("тысяча", "тысячи", "тысяч"), True),
+    (("миллион", "миллиона", "миллионов"), False),
+    (("миллиард", "миллиарда", "миллиардов"), False),
+    (("триллион", "триллиона", "триллионов"), False),
+)
+MAX_NUMBER = 1000 ** len(SCALES) - 1
 
 
 def format_int_with_spaces(n: int) -> str:
     return f"{n:,}".replace(",", " ")
 
 
+def plural_form(n: int, forms: tuple[str, str, str]) -> str:
+    """Pick the (one, few, many) form agreeing with ``n``: 1 тысяча, 2 тысячи, 5 тысяч."""
+    if n % 100 in range(11, 15):
+        return forms[2]
+    last = n % 10
+    if last == 1:
+        return forms[0]
+    if last in (2, 3, 4):
+        return forms[1]
+    return forms[2]
+
+
+def _triad_words(triad: int, feminine: bool) -> list[str]:
+    words = [HUNDREDS[triad // 100]]
+    rest = triad % 100
+    if 10 <= rest < 20:
+        words.append(TEENS[rest - 10])
+    else:
+        words.append(TENS[rest // 10])
+        words.append((ONES_FEMININE if feminine else ONES_MASCULINE)[rest % 10])
+    return [word for word in words if word]
+
+
+@lru_cache(maxsize=4096)
 def int_to_words_ru(n: int) -> str:
-    return num2words(n, lang="ru")
+    """Russian cardinal in the masculine, as num2words(n, lang="ru") spells it."""
+    if n < 0:
+        return f"минус {int_to_words_ru(-n)}"
+    if n == 0:
+        return "ноль"
+    if n > MAX_NUMBER:
+        raise ValueError(f"Number is too large to spell out: {n}")
+
+    words: list[str] = []
+    for scale in range(len(SCALES) - 1, -1, -1):
+        triad = n // 1000**scale % 1000
+        if not triad:
+            continue
+        forms, feminine = SCALES[scale]
+        words.extend(_triad_words(triad, feminine))
+        if scale:
+            words.append(plural_form(triad, forms))
+    return " ".join(words)
 
 
 def build_tons_full(tons: int) -> str:
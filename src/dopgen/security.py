@@ -1,6 +1,9 @@
 ﻿from __future__ import annotations
 
 from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+import base64
 import os
 from pathlib import Path
 
@@ -9,7 +12,8 @@ class SecurityError(RuntimeError):
     """Raised when encryption or decryption cannot be completed."""
 
 
-def load_fernet_from_env(env_key_name: str = "CLIENTS_KEY") -> Fernet:
+def load_key_from_env(env_key_name: str = "CLIENTS_KEY") -> str:
+    """Fernet key from ``env_key_name`` or the file named by ``<env_key_name>_FILE``, re-padded."""
     key = (os.getenv(env_key_name) or "").strip()
     key_file = (os.getenv(f"{env_key_name}_FILE") or "").strip()
 
@@ -34,19 +38,32 @@ def load_fernet_from_env(env_key_name: str = "CLIENTS_KEY") -> Fernet:
     # Re-pad to base64 block size before Fernet validation.
     padded_key = key + ("=" * (-len(key) % 4))
     try:
-        return Fernet(padded_key.encode("utf-8"))
+        Fernet(padded_key.encode("utf-8"))
     except Exception as exc:  # pragma: no cover - defensive
         raise SecurityError(
             f"{env_key_name} has invalid format for Fernet (received length={len(key)}). "
             "Expected URL-safe base64 key (usually 44 chars, often ends with '=')."
         ) from exc
+    return padded_key
+
+
+def load_fernet_from_env(env_key_name: str = "CLIENTS_KEY") -> Fernet:
+    return Fernet(load_key_from_env(env_key_name).encode("utf-8"))
+
+
+def derive_key(fernet_key: str, purpose: bytes) -> bytes:
+    """Independent 256-bit key for ``purpose``, derived from a Fernet key with HKDF-SHA256."""
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=purpose)
+    return hkdf.derive(base64.urlsafe_b64decode(fernet_key.encode("utf-8")))
 
 
 def decrypt_clients_file(path: Path, fernet: Fernet) -> dict[str, dict[str, str]]:
     if not path.exists():
         raise SecurityError(f"Encrypted clients file not found: {path}")
+    return decrypt_clients_payload(path.read_bytes(), fernet)
+
 
-    encrypted = path.read_bytes()
+def decrypt_clients_payload(encrypted: bytes, fernet: Fernet) -> dict[str, dict[str, str]]:
     try:
         decrypted = fernet.decrypt(encrypted)
     except InvalidToken as exc:
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import time
+
+
+class PhaseTimer:
+    """Collects wall-clock durations of named startup phases, in order."""
+
+    def __init__(self) -> None:
+        self.phases: list[tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self) -> str:
+        width = max((len(name) for name, _ in self.phases), default=0)
+        lines = [f"{name:<{width}}  {seconds * 1000:8.1f} ms" for name, seconds in self.phases]
+        total = sum(seconds for _, seconds in self.phases)
+        lines.append(f"{'total':<{width}}  {total * 1000:8.1f} ms")
+        return "\n".join(lines)
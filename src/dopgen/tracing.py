@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import json
+import logging
+from pathlib import Path
+import queue
+import random
+import threading
+import time
+from typing import Any, Protocol
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start: float
+    duration: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    # Finished spans of the whole trace, shared by every span in it.
+    _finished: list[Span] = field(default_factory=list, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when tracing is off or the trace was not sampled."""
+
+    def set(self, **attributes: Any) -> None:
+        return
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to ``path``.
+
+    Traces end on the event loop, so ``export`` only queues the lines; a writer
+    thread appends them to the file, several traces per write when they pile up.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._queue: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+
+    def export(self, spans: list[Span]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+            for span in spans
+        )
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                self._writer.start()
+        self._queue.put(lines)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            try:
+                with self.path.open("a", encoding="utf-8") as fp:
+                    fp.write("".join(item for item in batch if item is not None))
+            except OSError:
+                logger.exception("Failed to write traces to %s", self.path)
+            if done:
+                return
+
+    def close(self) -> None:
+        """Write out queued traces and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+
+@dataclass
+class Tracer:
+    exporter: SpanExporter
+    sample_rate: float = 1.0
+
+
+_TRACER: Tracer | None = None
+_CURRENT: ContextVar[Span | None] = ContextVar("dopgen_current_span", default=None)
+
+
+def configure_tracing(exporter: SpanExporter | None, sample_rate: float = 1.0) -> None:
+    """Install the exporter for new traces; ``None`` turns tracing off."""
+    global _TRACER
+    if not 0 <= sample_rate <= 1:
+        raise ValueError(f"Trace sample rate must be between 0 and 1, got {sample_rate}.")
+    _TRACER = Tracer(exporter, sample_rate) if exporter is not None else None
+
+
+def shutdown_tracing() -> None:
+    """Turn tracing off and flush the exporter, if it buffers."""
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    close = getattr(tracer.exporter, "close", None) if tracer is not None else None
+    if close is not None:
+        close()
+
+
+def _new_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+@contextmanager
+def _run_span(span: Span) -> Iterator[Span]:
+    token = _CURRENT.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = type(exc).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - started
+        _CURRENT.reset(token)
+        span._finished.append(span)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Open a root span; the trace is exported when it ends, if it was sampled."""
+    tracer = _TRACER
+    if tracer is None or random.random() >= tracer.sample_rate:
+        yield NOOP_SPAN
+        return
+
+    root = Span(_new_id(), _new_id(), None, name, time.time(), attributes=dict(attributes))
+    try:
+        with _run_span(root):
+            yield root
+    finally:
+        try:
+            tracer.exporter.export(root._finished)
+        except Exception:
+            logger.exception("Failed to export trace %s", root.trace_id)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Child span of the current one; a no-op outside a sampled trace."""
+    parent = _CURRENT.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(
+        parent.trace_id,
+        _new_id(),
+        parent.span_id,
+        name,
+        time.time(),
+        attributes=dict(attributes),
+        _finished=parent._finished,
+    )
+    with _run_span(child):
+        yield child
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Hashable
+import os
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+DEFAULT_CONCURRENT_UPDATES = 16
+# Updates admitted at once, including those waiting for an earlier update of the same user.
+DEFAULT_MAX_PENDING_UPDATES = 1024
+
+
+def update_key(update: object) -> Hashable | None:
+    """Serialization key matching ConversationHandler's default per_chat/per_user key."""
+    if not isinstance(update, Update):
+        return None
+    chat = update.effective_chat
+    user = update.effective_user
+    if chat is None and user is None:
+        return None
+    return (chat.id if chat else None, user.id if user else None)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Runs updates of different users concurrently, one user's updates in arrival order.
+
+    The application starts a task per update; each task first waits for the
+    previous update with the same chat/user key (asyncio locks wake waiters in
+    FIFO order), and only then takes one of ``concurrency`` running slots. A user
+    sending many messages therefore queues behind their own updates without
+    occupying slots other users need.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENT_UPDATES,
+        max_pending: int = DEFAULT_MAX_PENDING_UPDATES,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be a positive integer.")
+        super().__init__(max(max_pending, concurrency))
+        self.concurrency = concurrency
+        self._running = asyncio.Semaphore(concurrency)
+        # key -> (lock, number of updates holding or waiting for it)
+        self._locks: dict[Hashable, tuple[asyncio.Lock, int]] = {}
+        self._in_flight: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls) -> "PerUserUpdateProcessor":
+        try:
+            concurrency = int((os.getenv("CONCURRENT_UPDATES") or str(DEFAULT_CONCURRENT_UPDATES)).strip())
+        except ValueError as exc:
+            raise RuntimeError("CONCURRENT_UPDATES must be an integer.") from exc
+        if concurrency < 1:
+            raise RuntimeError("CONCURRENT_UPDATES must be at least 1.")
+        return cls(concurrency)
+
+    @property
+    def active_users(self) -> int:
+        return len(self._locks)
+
+    def _acquire_slot(self, key: Hashable) -> asyncio.Lock:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        return lock
+
+    def _release_slot(self, key: Hashable) -> None:
+        lock, users = self._locks[key]
+        if users == 1:
+            del self._locks[key]
+        else:
+            self._locks[key] = (lock, users - 1)
+
+    async def wait_in_flight(self) -> None:
+        """Wait for the updates admitted so far; ones arriving meanwhile are not waited for."""
+        current = asyncio.current_task()
+        pending = {task for task in self._in_flight if task is not current}
+        if pending:
+            await asyncio.wait(pending)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # The application runs every update in its own task.
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        try:
+            await self._process(update, coroutine)
+        finally:
+            self._in_flight.discard(task)
+
+    async def _process(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = update_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        lock = self._acquire_slot(key)
+        try:
+            async with lock, self._running:
+                await coroutine
+        finally:
+            self._release_slot(key)
+
+    async def initialize(self) -> None:
+        return
+
+    async def shutdown(self) -> None:
+        return
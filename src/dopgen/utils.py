@@ -1,15 +1,44 @@
 ﻿from __future__ import annotations
 
+from collections.abc import Iterable, Iterator, Mapping
 import re
+from typing import TypeVar
+
+from .fuzzy import FuzzyIndex, match_terms
+from .records import ClientRecord, client_record, intern_text
 
 
 INVALID_WIN_CHARS_RE = re.compile(r'[<>:"/\\|?*\x00-\x1F]')
+QUOTES_RE = re.compile(r"[«»\"'„“”‘’]")
+LEGAL_FORMS = (
+    "общество с ограниченной ответственностью",
+    "публичное акционерное общество",
+    "закрытое акционерное общество",
+    "открытое акционерное общество",
+    "непубличное акционерное общество",
+    "акционерное общество",
+    "индивидуальный предприниматель",
+    "ооо",
+    "пао",
+    "зао",
+    "оао",
+    "ао",
+    "ип",
+)
+LEGAL_FORM_RE = re.compile(r"^(?:" + "|".join(re.escape(form) for form in LEGAL_FORMS) + r")(?:\s+|$)")
 
 
 def normalize_text(s: str) -> str:
     return s.lower().strip().replace("ё", "е")
 
 
+def normalize_company_name(s: str) -> str:
+    """Normalize a legal name for matching: no quotes, no leading legal form."""
+    name = QUOTES_RE.sub(" ", normalize_text(s))
+    name = re.sub(r"\s+", " ", name).strip()
+    return LEGAL_FORM_RE.sub("", name, count=1).strip()
+
+
 def sanitize_filename(name: str) -> str:
     cleaned = INVALID_WIN_CHARS_RE.sub("_", name)
     cleaned = re.sub(r"\s+", " ", cleaned).strip(" .")
@@ -23,10 +52,113 @@ def normalize_contract(raw: str) -> str:
     return contract
 
 
-def search_catalog(query: str, data: dict[str, str], limit: int = 10) -> list[tuple[str, str]]:
+NGRAM_SIZE = 3
+# Once this few candidates remain, the substring check itself is cheaper than
+# intersecting the remaining (larger) postings.
+SUBSTRING_CHECK_CANDIDATES = 32
+_T = TypeVar("_T")
+
+
+class Matches(list[_T]):
+    """Search results; ``fuzzy`` is set when they come from the typo-tolerant fallback.
+
+    Fuzzy results are guesses, so they are offered for confirmation even when
+    there is only one.
+    """
+
+    def __init__(self, items: Iterable[_T] = (), fuzzy: bool = False) -> None:
+        super().__init__(items)
+        self.fuzzy = fuzzy
+
+
+def _ngrams(text: str, n: int = NGRAM_SIZE) -> set[str]:
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class CatalogIndex(Mapping[str, str]):
+    """Read-only catalog with normalized keys/values and lookup indexes built once.
+
+    Behaves like the ``dict`` it wraps, so handlers can keep using
+    ``catalog[key]`` and ``key in catalog``; ``search_catalog`` uses the indexes.
+    """
+
+    def __init__(self, data: Mapping[str, str]) -> None:
+        # Interned, so keys stored in user_data can share the catalog's own strings.
+        self._data = {intern_text(key): intern_text(value) for key, value in data.items()}
+        self._keys = list(self._data)
+        self._norm_keys = [normalize_text(key) for key in self._keys]
+        self._norm_values = [normalize_text(str(self._data[key])) for key in self._keys]
+
+        self._exact: dict[str, list[int]] = {}
+        self._grams: dict[str, list[int]] = {}
+        for pos, (key_norm, value_norm) in enumerate(zip(self._norm_keys, self._norm_values)):
+            self._exact.setdefault(key_norm, []).append(pos)
+            for gram in _ngrams(key_norm) | _ngrams(value_norm):
+                self._grams.setdefault(gram, []).append(pos)
+        self._fuzzy = FuzzyIndex(
+            match_terms(key_norm, value_norm) for key_norm, value_norm in zip(self._norm_keys, self._norm_values)
+        )
+
+    def __getitem__(self, key: str) -> str:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _substring_candidates(self, q: str) -> list[int] | range:
+        if len(q) < NGRAM_SIZE:
+            return range(len(self._keys))
+        postings = []
+        for gram in _ngrams(q):
+            positions = self._grams.get(gram)
+            if not positions:
+                return []
+            postings.append(positions)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            if len(candidates) <= SUBSTRING_CHECK_CANDIDATES:
+                break
+            candidates.intersection_update(positions)
+            if not candidates:
+                return []
+        return sorted(candidates)
+
+    def search(self, query: str, limit: int = 10) -> Matches[tuple[str, str]]:
+        q = normalize_text(query)
+        if not q:
+            return Matches()
+
+        exact = self._exact.get(q, [])
+        results = [(self._keys[pos], self._data[self._keys[pos]]) for pos in exact[:limit]]
+        seen = set(exact)
+        for pos in self._substring_candidates(q):
+            if len(results) >= limit:
+                break
+            if pos in seen:
+                continue
+            if q in self._norm_keys[pos] or q in self._norm_values[pos]:
+                key = self._keys[pos]
+                results.append((key, self._data[key]))
+        if results:
+            return Matches(results)
+
+        # Nothing typed matches literally: fall back to typo-tolerant ranking.
+        return Matches(
+            ((self._keys[pos], self._data[self._keys[pos]]) for pos in self._fuzzy.search(q, limit)), fuzzy=True
+        )
+
+
+def search_catalog(query: str, data: Mapping[str, str], limit: int = 10) -> Matches[tuple[str, str]]:
+    if isinstance(data, CatalogIndex):
+        return data.search(query, limit)
+
     q = normalize_text(query)
     if not q:
-        return []
+        return Matches()
 
     results: list[tuple[str, str]] = []
     seen: set[str] = set()
@@ -45,4 +177,146 @@ def search_catalog(query: str, data: dict[str, str], limit: int = 10) -> list[tu
             results.append((key, value))
             seen.add(key)
 
-    return results[:limit]
+    return Matches(results[:limit])
+
+
+class CompanyIndex(Mapping[str, ClientRecord]):
+    """Read-only clients catalog with precomputed company lookup structures.
+
+    Holds normalized client keys, legal names with and without the legal form
+    and quotes, and the alias map, so ``find`` does not re-normalize the catalog.
+    """
+
+    def __init__(
+        self, clients: Mapping[str, ClientRecord | dict], aliases: Mapping[str, str] | None = None
+    ) -> None:
+        # A source that can name a client without loading its record (LazyClients) is kept
+        # as is, so building the index does not decrypt every client.
+        self._lazy = callable(getattr(clients, "company_name", None))
+        self._data: Mapping[str, ClientRecord] = (
+            clients if self._lazy else {intern_text(key): client_record(value) for key, value in clients.items()}
+        )
+        self._keys = list(self._data)
+        self._aliases = {normalize_text(k): normalize_text(v) for k, v in (aliases or {}).items()}
+
+        self._exact: dict[str, list[int]] = {}
+        self._names: list[str] = []
+        self._short_names: list[str] = []
+        self._grams: dict[str, list[int]] = {}
+        for pos, key in enumerate(self._keys):
+            raw_name = self.company_name(key)
+            name = normalize_text(raw_name)
+            short_name = normalize_company_name(raw_name)
+            self._names.append(name)
+            self._short_names.append(short_name)
+            self._exact.setdefault(normalize_text(key), []).append(pos)
+            for gram in _ngrams(name) | _ngrams(short_name):
+                self._grams.setdefault(gram, []).append(pos)
+        self._fuzzy = FuzzyIndex(
+            match_terms(normalize_text(key), short_name) for key, short_name in zip(self._keys, self._short_names)
+        )
+
+    def __getitem__(self, key: str) -> ClientRecord:
+        return self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    @property
+    def source(self) -> Mapping[str, ClientRecord]:
+        return self._data
+
+    def company_name(self, key: str) -> str:
+        if self._lazy:
+            return self._data.company_name(key)
+        return self._data[key].company_name
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _candidates(self, q: str) -> list[int] | range:
+        if len(q) < NGRAM_SIZE:
+            return range(len(self._keys))
+        postings = []
+        for gram in _ngrams(q):
+            positions = self._grams.get(gram)
+            if not positions:
+                return []
+            postings.append(positions)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            if len(candidates) <= SUBSTRING_CHECK_CANDIDATES:
+                break
+            candidates.intersection_update(positions)
+        return sorted(candidates)
+
+    def _keys_at(self, positions: list[int], fuzzy: bool = False) -> Matches[str]:
+        keys = (self._keys[pos] for pos in positions)
+        if self._lazy:
+            # Clients whose record turned out to be damaged are no longer in the source.
+            keys = (key for key in keys if key in self._data)
+        return Matches(keys, fuzzy)
+
+    def find(self, query: str) -> Matches[str]:
+        normalized = normalize_text(query)
+        if not normalized:
+            return Matches()
+        # A client key typed verbatim wins over an alias pointing elsewhere.
+        if normalized in self._exact:
+            return self._keys_at(self._exact[normalized])
+
+        alias_target = self._aliases.get(normalized)
+        if alias_target:
+            normalized = alias_target
+            if normalized in self._exact:
+                return self._keys_at(self._exact[normalized])
+
+        short_query = normalize_company_name(normalized) or normalized
+        if short_query in self._exact:
+            return self._keys_at(self._exact[short_query])
+
+        # Like find_company_matches: every company containing the query, an equal name included.
+        matches = set()
+        for q in {normalized, short_query}:
+            for pos in self._candidates(q):
+                if q in self._names[pos] or q in self._short_names[pos]:
+                    matches.add(pos)
+        if matches:
+            return self._keys_at(sorted(matches))
+        return self._keys_at(self._fuzzy.search(short_query), fuzzy=True)
+
+
+def find_company_matches(
+    query: str, aliases: dict[str, str], clients: Mapping[str, ClientRecord | dict]
+) -> Matches[str]:
+    if isinstance(clients, CompanyIndex):
+        return clients.find(query)
+
+    normalized = normalize_text(query)
+    alias_target = aliases.get(normalized)
+    if alias_target:
+        normalized = normalize_text(alias_target)
+
+    exact = [key for key in clients if normalize_text(key) == normalized]
+    if exact:
+        return Matches(exact)
+
+    # Same sources as CompanyIndex: dicts, ClientRecords, or LazyClients (named without decrypting).
+    lazy = callable(getattr(clients, "company_name", None))
+    matches = []
+    for key in clients:
+        if lazy:
+            company_name = clients.company_name(key)
+        else:
+            payload = clients[key]
+            if isinstance(payload, ClientRecord):
+                company_name = payload.company_name
+            else:
+                company_name = str(payload.get("company_name", ""))
+        if normalized and normalized in normalize_text(company_name):
+            matches.append(key)
+    return Matches(matches)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from cryptography.fernet import Fernet
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen import clients_snapshot
+from src.dopgen.clients_snapshot import (
+    load_clients_with_snapshot,
+    read_snapshot,
+    snapshot_cipher,
+    source_digest,
+)
+from src.dopgen.clients_store import write_chunked_clients
+
+KEY = Fernet.generate_key().decode("ascii")
+CLIENTS = {
+    "ромашка": {
+        "company_name": "ООО «Ромашка»",
+        "contract": "№ 12/2025-П",
+        "director_position": "Генерального директора",
+        "director_fio": "Иванова Ивана Ивановича",
+        "initials": "И.И. Иванов",
+    },
+}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    enc_path = tmp_path / "clients.enc"
+    write_chunked_clients(enc_path, CLIENTS, KEY)
+    snapshot_path = tmp_path / "cache" / "clients.snapshot"
+    assert load_clients_with_snapshot(enc_path, KEY, snapshot_path) == CLIENTS
+    assert snapshot_path.exists()
+    return enc_path, snapshot_path
+
+
+def _snapshot_matches(enc_path: Path, snapshot_path: Path) -> bool:
+    digest = source_digest(enc_path.read_bytes())
+    return read_snapshot(snapshot_path, digest, snapshot_cipher(KEY)) is not None
+
+
+def test_snapshot_is_used_for_the_same_ciphertext(paths, monkeypatch):
+    enc_path, snapshot_path = paths
+
+    def fail(*args):
+        raise AssertionError("clients.enc was decrypted despite a valid snapshot")
+
+    monkeypatch.setattr(clients_snapshot, "decrypt_registry", fail)
+    assert load_clients_with_snapshot(enc_path, KEY, snapshot_path) == CLIENTS
+
+
+def test_tampered_snapshot_is_rejected_and_rebuilt(paths):
+    enc_path, snapshot_path = paths
+    blob = bytearray(snapshot_path.read_bytes())
+    blob[-1] ^= 0xFF
+    snapshot_path.write_bytes(bytes(blob))
+    assert not _snapshot_matches(enc_path, snapshot_path)
+
+    assert load_clients_with_snapshot(enc_path, KEY, snapshot_path) == CLIENTS
+    assert _snapshot_matches(enc_path, snapshot_path)
+
+
+def test_stale_snapshot_is_rejected_and_rebuilt(paths):
+    enc_path, snapshot_path = paths
+    edited = {"ромашка": {**CLIENTS["ромашка"], "contract": "№ 4/2026"}}
+    write_chunked_clients(enc_path, edited, KEY)
+    assert not _snapshot_matches(enc_path, snapshot_path)
+
+    assert load_clients_with_snapshot(enc_path, KEY, snapshot_path) == edited
+    assert _snapshot_matches(enc_path, snapshot_path)
+
+
+def test_snapshot_from_another_key_is_rejected(paths):
+    enc_path, snapshot_path = paths
+    digest = source_digest(enc_path.read_bytes())
+    other = snapshot_cipher(Fernet.generate_key().decode("ascii"))
+    assert read_snapshot(snapshot_path, digest, other) is None
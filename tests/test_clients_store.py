@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from cryptography.fernet import Fernet
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.clients_store import ChunkedClients, LazyClients, write_chunked_clients
+from src.dopgen.utils import CompanyIndex
+
+KEY = Fernet.generate_key().decode("ascii")
+CLIENTS = {
+    "ромашка": {
+        "company_name": "ООО «Ромашка»",
+        "contract": "№ 12/2025-П",
+        "director_position": "Генерального директора",
+        "director_fio": "Иванова Ивана Ивановича",
+        "initials": "И.И. Иванов",
+    },
+    "лютик": {
+        "company_name": "АО «Лютик»",
+        "contract": "№ 3/2024",
+        "director_position": "Директора",
+        "director_fio": "Петрова Петра Петровича",
+        "initials": "П.П. Петров",
+    },
+    "василёк": {
+        "company_name": "ООО «Василёк»",
+        "contract": "№ 7/2025-Д",
+        "director_position": "Генерального директора",
+        "director_fio": "Сидоровой Анны Сергеевны",
+        "initials": "А.С. Сидорова",
+    },
+}
+
+
+def _corrupt_record(path: Path, key: str) -> None:
+    with ChunkedClients(path.read_bytes(), KEY) as registry:
+        position = registry._data_start + registry.entries[key].offset
+    blob = bytearray(path.read_bytes())
+    blob[position] ^= 0xFF
+    path.write_bytes(bytes(blob))
+
+
+def test_rewrite_reuses_unchanged_ciphertexts(tmp_path):
+    path = tmp_path / "clients.enc"
+    assert write_chunked_clients(path, CLIENTS, KEY) == (3, 0)
+    with ChunkedClients(path.read_bytes(), KEY) as previous:
+        before = {key: previous.raw_record(key) for key in CLIENTS}
+        edited = {**CLIENTS, "лютик": {**CLIENTS["лютик"], "contract": "№ 4/2026"}}
+        assert write_chunked_clients(path, edited, KEY, previous) == (1, 2)
+
+    with ChunkedClients(path.read_bytes(), KEY) as registry:
+        assert registry.read_all() == edited
+        assert registry.raw_record("ромашка") == before["ромашка"]
+        assert registry.raw_record("лютик") != before["лютик"]
+
+
+def test_rewrite_re_encrypts_damaged_records(tmp_path):
+    path = tmp_path / "clients.enc"
+    write_chunked_clients(path, CLIENTS, KEY)
+    _corrupt_record(path, "ромашка")
+
+    with ChunkedClients(path.read_bytes(), KEY) as previous:
+        assert previous.intact_record("ромашка") is None
+        assert previous.intact_record("лютик") is not None
+        assert write_chunked_clients(path, CLIENTS, KEY, previous) == (1, 2)
+
+    with ChunkedClients(path.read_bytes(), KEY) as registry:
+        assert registry.read_all() == CLIENTS
+
+
+def test_lazy_clients_treat_damaged_record_as_missing(tmp_path, caplog):
+    path = tmp_path / "clients.enc"
+    write_chunked_clients(path, CLIENTS, KEY)
+    _corrupt_record(path, "ромашка")
+    clients = LazyClients(ChunkedClients(path.read_bytes(), KEY))
+    index = CompanyIndex(clients)
+    try:
+        # Company names come from the index header, so the damage shows up on first read.
+        assert index.find("ромашка") == ["ромашка"]
+        assert clients.get("ромашка") is None
+        assert "failed authentication" in caplog.text
+        with pytest.raises(KeyError):
+            clients["ромашка"]
+
+        assert "ромашка" not in clients
+        assert sorted(clients) == ["василёк", "лютик"]
+        assert len(clients) == 2
+        assert index.find("ромашка") == []
+        assert index.find("ооо") == ["василёк"]
+        assert clients["лютик"].company_name == "АО «Лютик»"
+    finally:
+        clients.close()
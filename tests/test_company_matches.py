@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.records import ClientRecord
+from src.dopgen.utils import CompanyIndex, find_company_matches
+
+CLIENTS = {
+    "ромашка": ClientRecord(company_name="ООО «Ромашка»", contract="№ 12/2025-П"),
+    "лютик": {"company_name": "АО «Лютик»", "contract": "№ 3/2024"},
+}
+
+
+def test_plain_mapping_accepts_records_and_dicts():
+    aliases = {"цветок": "лютик"}
+
+    assert find_company_matches("ромашка", aliases, CLIENTS) == ["ромашка"]
+    assert find_company_matches("цветок", aliases, CLIENTS) == ["лютик"]
+    assert find_company_matches("«ромашка»", aliases, CLIENTS) == ["ромашка"]
+    assert find_company_matches("лютик»", aliases, CLIENTS) == ["лютик"]
+    assert find_company_matches("василёк", aliases, CLIENTS) == []
+
+
+def test_plain_mapping_agrees_with_company_index():
+    index = CompanyIndex(CLIENTS)
+    for query in ("ромашка", "«ромашка»", "ао «лютик»", "ооо"):
+        assert find_company_matches(query, {}, CLIENTS) == find_company_matches(query, {}, index)
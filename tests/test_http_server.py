@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.http_server import MAX_BODY_SIZE, HttpServer, Request, Response
+
+REQUEST_TIMEOUT = 0.4
+
+
+async def _echo(request: Request) -> Response:
+    return Response(body=request.body or b"ok")
+
+
+async def _exchange(*chunks: bytes, pause: float = 0.0) -> tuple[bytes, float]:
+    """Send ``chunks`` with ``pause`` between them; return the reply and how long it took."""
+    server = HttpServer("127.0.0.1", 0, request_timeout=REQUEST_TIMEOUT)
+    server.route("POST", "/hook", _echo)
+    await server.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        started = time.perf_counter()
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(pause)
+            writer.write(chunk)
+            await writer.drain()
+        reply = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return reply, time.perf_counter() - started
+    finally:
+        await server.stop()
+
+
+def test_complete_request_is_served():
+    request = b"POST /hook HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\nhi"
+    reply, _ = asyncio.run(_exchange(request))
+    assert reply.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert reply.endswith(b"\r\n\r\nhi")
+
+
+def test_trickled_headers_time_out():
+    # Each gap is shorter than the timeout; the request as a whole is not.
+    chunks = [b"POST /hook HTTP/1.1\r\n", b"X-Slow: 1\r\n"]
+    reply, elapsed = asyncio.run(_exchange(*chunks, pause=0.3))
+    assert reply.startswith(b"HTTP/1.1 408 Request Timeout\r\n")
+    assert elapsed < 0.3 + REQUEST_TIMEOUT
+
+
+def test_incomplete_body_times_out():
+    request = b"POST /hook HTTP/1.1\r\nContent-Length: 100\r\n\r\npartial"
+    reply, elapsed = asyncio.run(_exchange(request))
+    assert reply.startswith(b"HTTP/1.1 408 Request Timeout\r\n")
+    assert elapsed < 2 * REQUEST_TIMEOUT
+
+
+def test_content_length_is_capped_and_validated():
+    too_large = f"POST /hook HTTP/1.1\r\nContent-Length: {MAX_BODY_SIZE + 1}\r\n\r\n".encode()
+    reply, _ = asyncio.run(_exchange(too_large))
+    assert reply.startswith(b"HTTP/1.1 413 Payload Too Large\r\n")
+
+    negative = b"POST /hook HTTP/1.1\r\nContent-Length: -5\r\n\r\n"
+    reply, _ = asyncio.run(_exchange(negative))
+    assert reply.startswith(b"HTTP/1.1 400 Bad Request\r\n")
+
+
+def test_oversized_headers_are_rejected():
+    request = b"POST /hook HTTP/1.1\r\nX-Padding: " + b"a" * 20_000 + b"\r\n\r\n"
+    reply, _ = asyncio.run(_exchange(request))
+    assert reply.startswith(b"HTTP/1.1 400 Bad Request\r\n")
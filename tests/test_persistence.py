@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+from datetime import date
+import json
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+for path in (ROOT_DIR, ROOT_DIR / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from fake_telegram import FakeTelegramServer
+
+import bot
+from src.dopgen.persistence import SqlitePersistence
+from src.dopgen.state import COMPANY_INPUT, UNLOAD_ADDRESS
+
+TOKEN = "123456:TEST"
+CLIENT = {
+    "company_name": "ООО «Ромашка»",
+    "contract": "№ 12/2025-П",
+    "director_position": "Генерального директора",
+    "director_fio": "Иванова Ивана Ивановича",
+    "initials": "И.И. Иванов",
+}
+REMOVED_USER = 501
+KEPT_USER = 502
+
+
+def _session(company_key: str) -> dict:
+    """user_data of a manager who is about to type the unload address."""
+    return {
+        "company_key": company_key,
+        "dop_num": "7",
+        "payment_type": "prepayment",
+        "delivery_type": "delivery",
+        "current_date": date(2026, 3, 1),
+        "delivery_date": date(2026, 3, 15),
+        "pay_date": date(2026, 3, 1),
+        "product_key": "дтл",
+        "tons": 25,
+        "price": 62500,
+        "location_key": "танеко",
+    }
+
+
+async def _store_sessions(db_path: Path) -> None:
+    persistence = SqlitePersistence(db_path, resolve_client=lambda key: None)
+    for user_id, company_key in ((REMOVED_USER, "удалённая"), (KEPT_USER, "ромашка")):
+        await persistence.update_user_data(user_id, _session(company_key))
+        await persistence.update_conversation("generate", (user_id, user_id), UNLOAD_ADDRESS)
+    await persistence.flush()
+
+
+async def _next_text(server: FakeTelegramServer, user_id: int) -> str:
+    call = await asyncio.wait_for(server.chat(user_id).outbox.get(), 10)
+    return call.text
+
+
+async def _restart_and_continue(db_path: Path, monkeypatch) -> dict[int, list[str]]:
+    server = FakeTelegramServer(TOKEN)
+    await server.start()
+    clients = json.dumps({"ромашка": CLIENT}, ensure_ascii=False).encode("utf-8")
+    monkeypatch.setenv("BOT_TOKEN", TOKEN)
+    monkeypatch.setenv("TELEGRAM_API_URL", server.base_url)
+    monkeypatch.setenv("CLIENTS_JSON_B64", base64.urlsafe_b64encode(clients).decode("ascii"))
+    monkeypatch.setenv("STATE_DB_PATH", str(db_path))
+    monkeypatch.setenv("CATALOG_WATCH_INTERVAL", "0")
+    monkeypatch.setenv("RENDER_WARMUP", "off")
+    app = bot.build_application()
+    replies: dict[int, list[str]] = {REMOVED_USER: [], KEPT_USER: []}
+    try:
+        await app.initialize()
+        await app.start()
+        await app.updater.start_polling(poll_interval=0, timeout=1)
+        for user_id in replies:
+            server.push_text(user_id, "г. Казань, ул. Тестовая, д. 1")
+        replies[KEPT_USER].append(await _next_text(server, KEPT_USER))
+        # The discarded session starts over from /start instead of resuming without a client.
+        server.push_text(REMOVED_USER, "/start")
+        replies[REMOVED_USER].append(await _next_text(server, REMOVED_USER))
+        server.push_text(REMOVED_USER, bot.BUTTON_CREATE)
+        replies[REMOVED_USER].append(await _next_text(server, REMOVED_USER))
+        await app.updater.stop()
+        await app.stop()
+    finally:
+        await app.shutdown()
+        await server.stop()
+    return replies
+
+
+def test_session_of_removed_client_is_discarded(tmp_path, monkeypatch, caplog):
+    db_path = tmp_path / "state.sqlite3"
+    asyncio.run(_store_sessions(db_path))
+
+    for name in ("PORT", "BOT_MODE", "ALLOWED_USER_IDS", "ADMIN_USER_IDS", "TRACE_FILE", "STATE_PERSISTENCE"):
+        monkeypatch.delenv(name, raising=False)
+    with caplog.at_level(logging.ERROR):
+        replies = asyncio.run(_restart_and_continue(db_path, monkeypatch))
+
+    assert replies[KEPT_USER][0].startswith("Проверьте данные:")
+    assert "ромашка (ООО «Ромашка»)" in replies[KEPT_USER][0]
+    assert replies[REMOVED_USER] == ["Выберите действие:", "компания, № доп. согл"]
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+
+    with sqlite3.connect(db_path) as conn:
+        stored_users = {row[0] for row in conn.execute("SELECT user_id FROM user_data")}
+        states = dict(conn.execute("SELECT conv_key, state FROM conversations"))
+    assert REMOVED_USER not in stored_users
+    assert states[f"[{REMOVED_USER},{REMOVED_USER}]"] == COMPANY_INPUT
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.render import RenderCache
+
+
+def test_evicts_least_recently_used_over_byte_budget():
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_skips_documents_larger_than_budget_and_shrinks_on_resize():
+    cache = RenderCache(max_bytes=10)
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.resize(4)
+    assert cache.get("a") is None
+    assert cache.get("b") == b"bbbb"
+
+    cache.resize(0)
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_changed_template_changes_the_key(tmp_path):
+    template = tmp_path / "template.docx"
+    template.write_bytes(b"first version")
+    cache = RenderCache()
+    context = {"company_name": "ООО «Ромашка»"}
+    before = cache.key(template, context, "docxtpl")
+    cache.put(before, b"rendered")
+    assert cache.key(template, context, "docxtpl") == before
+
+    # Same size, so only the modification time tells the edit apart from the cached digest.
+    template.write_bytes(b"other version")
+    stat = template.stat()
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    after = cache.key(template, context, "docxtpl")
+    assert after != before
+    assert cache.get(after) is None
+    assert cache.key(template, context, "fast") != after
+    assert cache.key(template, {**context, "dop_num": "2"}, "docxtpl") != after
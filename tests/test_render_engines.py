@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import date
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+from lxml import etree
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+for path in (ROOT_DIR, ROOT_DIR / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from compare_render_engines import SAMPLE_CLIENT
+
+from src.dopgen.data_loaders import load_locations, load_products
+from src.dopgen.render import TEMPLATE_MAP, build_context, render_docx_bytes
+
+CATALOGS = {
+    "products": load_products(ROOT_DIR / "data" / "products.json"),
+    "locations": load_locations(ROOT_DIR / "data" / "locations.json"),
+}
+
+
+def _document_xml(payload: bytes) -> etree._Element:
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        return etree.fromstring(archive.read("word/document.xml"))
+
+
+@pytest.mark.parametrize(("payment_type", "delivery_type"), list(TEMPLATE_MAP))
+def test_fast_engine_matches_docxtpl(payment_type, delivery_type):
+    collected = {
+        "company_key": "ромашка",
+        "client_data": SAMPLE_CLIENT,
+        "dop_num": "12",
+        "payment_type": payment_type,
+        "delivery_type": delivery_type,
+        "current_date": date(2024, 3, 1),
+        "delivery_date": date(2024, 3, 15),
+        "pay_date": date(2024, 4, 1),
+        "product_key": next(iter(CATALOGS["products"])),
+        "tons": 1250,
+        "price": 62500,
+        "location_key": next(iter(CATALOGS["locations"])),
+        "unload_address": "г. Казань, ул. Тестовая & Ко, д. 1",
+    }
+    context = build_context(collected, CATALOGS)
+    template_path = ROOT_DIR / TEMPLATE_MAP[(payment_type, delivery_type)]
+
+    expected = _document_xml(render_docx_bytes(template_path, context, "docxtpl"))
+    actual = _document_xml(render_docx_bytes(template_path, context, "fast"))
+
+    # The XML declarations differ in quoting; the canonical documents must not.
+    assert etree.tostring(actual, method="c14n") == etree.tostring(expected, method="c14n")
+    assert SAMPLE_CLIENT.company_name in "".join(expected.itertext())
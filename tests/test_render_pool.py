@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.render_pool import RenderPool, RenderPoolBusy
+
+
+def _wait(event: threading.Event) -> str:
+    event.wait(5)
+    return "done"
+
+
+async def _fill_and_overflow() -> list[str]:
+    pool = RenderPool(workers=1, queue_size=1, timeout=5)
+    release = threading.Event()
+    try:
+        running = asyncio.ensure_future(pool.run(_wait, release))
+        queued = asyncio.ensure_future(pool.run(_wait, release))
+        await asyncio.sleep(0)
+        assert pool.pending == pool.capacity == 2
+        with pytest.raises(RenderPoolBusy):
+            await pool.run(_wait, release)
+        release.set()
+        return await asyncio.gather(running, queued)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_full_pool_rejects_jobs():
+    assert asyncio.run(_fill_and_overflow()) == ["done", "done"]
+
+
+async def _time_out() -> None:
+    pool = RenderPool(workers=1, queue_size=0, timeout=0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(_wait, release)
+        # The abandoned job still occupies its worker, so the slot stays taken.
+        assert pool.pending == 1
+        with pytest.raises(RenderPoolBusy):
+            await pool.run(_wait, release)
+        release.set()
+        for _ in range(100):
+            if not pool.pending:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.pending == 0
+        assert await pool.run(_wait, release) == "done"
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes():
+    asyncio.run(_time_out())
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+for path in (ROOT_DIR, ROOT_DIR / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from src.dopgen.ru_numbers import int_to_words_ru
+
+SAMPLES = 3000
+
+
+@pytest.mark.parametrize(
+    ("number", "expected"),
+    [
+        (0, "ноль"),
+        (1, "один"),
+        (11, "одиннадцать"),
+        (21, "двадцать один"),
+        (101, "сто один"),
+        (1000, "одна тысяча"),
+        (2000, "две тысячи"),
+        (5000, "пять тысяч"),
+        (21000, "двадцать одна тысяча"),
+        (2000000, "два миллиона"),
+        (1234567, "один миллион двести тридцать четыре тысячи пятьсот шестьдесят семь"),
+        (1000000000, "один миллиард"),
+    ],
+)
+def test_int_to_words_ru(number, expected):
+    assert int_to_words_ru(number) == expected
+
+
+def test_matches_num2words_on_sample():
+    num2words = pytest.importorskip("num2words").num2words
+    from check_ru_numbers import boundary_numbers
+
+    # A sample of scripts/check_ru_numbers.py: triad edges plus log-uniform random numbers.
+    rng = random.Random(7)
+    numbers = boundary_numbers(10**9)
+    numbers.update(rng.randint(0, 10 ** rng.randint(1, 9)) for _ in range(SAMPLES))
+
+    mismatches = [n for n in sorted(numbers) if int_to_words_ru(n) != num2words(n, lang="ru")]
+    assert not mismatches, mismatches[:10]
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+import sys
+from pathlib import Path
+
+from telegram import Chat, Message, Update, User
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.dopgen.updates import PerUserUpdateProcessor, update_key
+
+
+def _update(update_id: int, user_id: int) -> Update:
+    user = User(id=user_id, first_name="Менеджер", is_bot=False)
+    message = Message(
+        message_id=update_id,
+        date=datetime(2026, 3, 1, tzinfo=timezone.utc),
+        chat=Chat(id=user_id, type=Chat.PRIVATE),
+        from_user=user,
+        text=f"сообщение {update_id}",
+    )
+    return Update(update_id=update_id, message=message)
+
+
+async def _run(arrivals: list[tuple[int, float]]) -> list[tuple[int, int]]:
+    processor = PerUserUpdateProcessor(concurrency=4)
+    finished: list[tuple[int, int]] = []
+
+    async def handle(update_id: int, user_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        finished.append((user_id, update_id))
+
+    await asyncio.gather(
+        *(
+            processor.process_update(_update(update_id, user_id), handle(update_id, user_id, delay))
+            for update_id, (user_id, delay) in enumerate(arrivals, start=1)
+        )
+    )
+    assert processor.active_users == 0
+    return finished
+
+
+def test_updates_of_one_user_finish_in_arrival_order():
+    # Earlier updates of user 1 are the slowest, so without ordering they would finish last.
+    finished = asyncio.run(_run([(1, 0.06), (1, 0.03), (2, 0.01), (1, 0.0), (2, 0.0)]))
+
+    assert [update_id for user_id, update_id in finished if user_id == 1] == [1, 2, 4]
+    assert [update_id for user_id, update_id in finished if user_id == 2] == [3, 5]
+    # Another user's updates do not wait for the slow one.
+    assert finished.index((2, 5)) < finished.index((1, 1))
+
+
+def test_update_key_matches_conversation_key():
+    assert update_key(_update(1, 42)) == (42, 42)
+    assert update_key("not an update") is None